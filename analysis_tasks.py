@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Tasks - Background QgsTask wrappers for long running analyses
+"""
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+
+RISK_COLORS = (
+    ('EXTREME', '#8B0000'),
+    ('HIGH', '#FF0000'),
+    ('MEDIUM', '#FFA500')
+)
+
+
+def risk_color(risk_level):
+    """Get the table background color for a flood risk level"""
+    for keyword, color in RISK_COLORS:
+        if keyword in risk_level:
+            return color
+    return '#FFFF00'
+
+
+class FloodAnalysisTask(QgsTask):
+    """
+    Flood risk analysis run by the QGIS task manager
+    run() queries and summarizes the flood-prone districts on a worker
+    thread; the results are handed to the GUI thread through analysisCompleted
+    or analysisFailed once the task finishes. Tasks can be cancelled from the
+    QGIS task bar, and several can be queued at once.
+    """
+
+    analysisCompleted = pyqtSignal(object)
+    analysisFailed = pyqtSignal(str)
+
+    def __init__(self, db_manager, selected_district="All Districts"):
+        super().__init__(f"Flood risk analysis: {selected_district}", QgsTask.CanCancel)
+        self.db_manager = db_manager
+        self.selected_district = selected_district
+
+        self.results = []
+        self.total_displaced = 0
+        self.risk_counts = {}
+        self.log = []
+        self.error = None
+
+    @property
+    def all_districts(self):
+        return self.selected_district == "All Districts"
+
+    def run(self):
+        """Worker thread: no widget access here"""
+        try:
+            results = self.db_manager.get_flood_prone_districts()
+            if self.isCanceled():
+                return False
+
+            if not self.all_districts:
+                results = [r for r in results if r['district'] == self.selected_district]
+
+            total = len(results)
+            for i, result in enumerate(results):
+                if self.isCanceled():
+                    return False
+
+                risk_level = result['flood_risk_level']
+
+                self.total_displaced += (result['total_people_displaced'] or 0)
+                self.risk_counts[risk_level] = self.risk_counts.get(risk_level, 0) + 1
+                self.log.append(f"✓ Analyzed: {result['district']} - {risk_level}")
+
+                self.setProgress((i + 1) * 100 / total)
+
+            self.results = results
+            return True
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+    def finished(self, result):
+        """GUI thread: deliver the results"""
+        if result:
+            self.analysisCompleted.emit(self)
+        elif self.error:
+            self.analysisFailed.emit(self.error)
+        else:
+            self.analysisFailed.emit("Analysis cancelled")
+
+
+class SummaryRefreshTask(QgsTask):
+    """
+    Refresh of the materialized flood-prone summary, run by the QGIS task manager
+    Readers keep getting the previous snapshot until REFRESH ... CONCURRENTLY
+    finishes, so no analysis waits on it.
+    """
+
+    refreshFinished = pyqtSignal(bool)
+    refreshFailed = pyqtSignal(str)
+
+    def __init__(self, db_manager):
+        super().__init__("Refresh flood-prone summary", QgsTask.Silent)
+        self.db_manager = db_manager
+
+        self.refreshed = False
+        self.error = None
+
+    def run(self):
+        """Worker thread: no widget access here"""
+        try:
+            if self.db_manager.has_flood_summary():
+                self.refreshed = self.db_manager.refresh_flood_summary()
+            return True
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+    def finished(self, result):
+        """GUI thread: report the refresh"""
+        if result:
+            self.refreshFinished.emit(self.refreshed)
+        else:
+            self.refreshFailed.emit(self.error or "Summary refresh cancelled")
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Async Database Manager - asyncio counterpart of DatabaseManager on psycopg 3
+"""
+
+import asyncio
+import itertools
+import sys
+import threading
+
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+if __package__:
+    from .database_manager import QUERIES
+else:
+    from database_manager import QUERIES
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+except ImportError:
+    psycopg = None
+
+
+class AsyncDatabaseManager:
+    """
+    Same get_* methods as DatabaseManager, as coroutines
+    Queries run on a small set of psycopg 3 async connections, so the
+    independent queries of one view can be awaited together with gather().
+    psycopg prepares the QUERIES server side after a few executions.
+    """
+
+    def __init__(self):
+        self.connection_params = {}
+        self._connections = []
+        self._idle = None
+        self._has_flood_summary = None
+
+    @staticmethod
+    def available():
+        """Check whether psycopg 3 is installed"""
+        return psycopg is not None
+
+    @property
+    def connected(self):
+        return bool(self._connections)
+
+    async def connect(self, host, port, database, user, password, max_connections=4):
+        """
+        Open max_connections async connections
+        Must be awaited on the event loop that later runs the queries
+        """
+        if psycopg is None:
+            return False, "Connection failed: psycopg 3 is not installed"
+
+        try:
+            await self.close()
+            self._has_flood_summary = None
+
+            self.connection_params = {
+                'host': host,
+                'port': port,
+                'dbname': database,
+                'user': user,
+                'password': password
+            }
+
+            self._connections = await asyncio.gather(*[
+                psycopg.AsyncConnection.connect(row_factory=dict_row, **self.connection_params)
+                for _ in range(max_connections)
+            ])
+            self._idle = asyncio.Queue()
+            for conn in self._connections:
+                self._idle.put_nowait(conn)
+            return True, "Connected successfully"
+        except Exception as e:
+            await self.close()
+            return False, f"Connection failed: {str(e)}"
+
+    async def execute_query(self, query, params=None, fetch=True):
+        """Execute SQL query on the next idle connection"""
+        conn = await self._acquire()
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                if fetch:
+                    rows = await cursor.fetchall()
+                    await conn.commit()
+                    return rows
+                await conn.commit()
+                return True
+        except Exception as e:
+            if not conn.closed:
+                await conn.rollback()
+            raise Exception(f"Query error: {str(e)}")
+        finally:
+            self._release(conn)
+
+    async def _acquire(self):
+        if not self._connections:
+            raise Exception("Query error: not connected")
+        return await self._idle.get()
+
+    def _release(self, conn):
+        # The queue is gone if close() ran while this query was in flight
+        if self._idle is not None:
+            self._idle.put_nowait(conn)
+
+    async def execute_named(self, name, params=None):
+        """Execute one of the fixed QUERIES by name"""
+        return await self.execute_query(QUERIES[name], params)
+
+    async def gather(self, **queries):
+        """
+        Await several query coroutines concurrently
+        Example: await db.gather(summary=db.get_district_summary(name),
+                                 centers=db.get_evacuation_centers(district_id))
+        Returns: dict with the same keys
+        """
+        results = await asyncio.gather(*queries.values())
+        return dict(zip(queries.keys(), results))
+
+    async def get_flood_prone_districts(self, use_summary=True):
+        """Get districts most prone to flooding, from the summary view as last refreshed"""
+        if use_summary and await self.has_flood_summary():
+            return await self.execute_named('flood_prone_districts_summary')
+        return await self.execute_named('flood_prone_districts')
+
+    async def has_flood_summary(self):
+        if self._has_flood_summary is None:
+            result = await self.execute_query(
+                "SELECT to_regclass('public.mv_flood_prone_districts') IS NOT NULL AS installed"
+            )
+            self._has_flood_summary = result[0]['installed']
+        return self._has_flood_summary
+
+    async def refresh_flood_summary(self, force=False):
+        """Refresh the materialized flood-prone summary if it is marked stale"""
+        conn = await self._acquire()
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    UPDATE summary_refresh_state
+                    SET stale = FALSE, refreshed_at = CURRENT_TIMESTAMP
+                    WHERE summary_name = 'mv_flood_prone_districts' AND (stale OR %s)
+                    RETURNING summary_name
+                """, (force,))
+
+                refreshed = await cursor.fetchone() is not None
+                if refreshed:
+                    await cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_flood_prone_districts")
+            await conn.commit()
+            return refreshed
+        except Exception as e:
+            if not conn.closed:
+                await conn.rollback()
+            raise Exception(f"Query error: {str(e)}")
+        finally:
+            self._release(conn)
+
+    async def get_district_by_river(self, river_name):
+        return await self.execute_named('district_by_river', (f'%{river_name}%',))
+
+    async def get_historical_events_in_district(self, district_name):
+        return await self.execute_named('historical_events_in_district', (district_name,))
+
+    async def get_all_districts(self):
+        return await self.execute_named('all_districts')
+
+    async def get_infrastructure_in_district(self, district_id):
+        return await self.execute_named('infrastructure_in_district', (district_id,))
+
+    async def get_evacuation_centers(self, district_id=None):
+        if district_id:
+            return await self.execute_named('evacuation_centers_by_district', (district_id,))
+        return await self.execute_named('evacuation_centers')
+
+    async def get_risk_zones(self, risk_level=None):
+        if risk_level:
+            return await self.execute_named('risk_zones_by_level', (risk_level,))
+        return await self.execute_named('risk_zones')
+
+    async def get_district_summary(self, district_name):
+        result = await self.execute_named('district_summary', (district_name,))
+        return result[0] if result else None
+
+    async def get_population_data(self, district_id):
+        return await self.execute_named('population_data', (district_id,))
+
+    async def close(self):
+        """Close all connections"""
+        connections, self._connections = self._connections, []
+        self._idle = None
+        for conn in connections:
+            await conn.close()
+
+
+class AsyncQueryRunner(QObject):
+    """
+    Runs coroutines on an asyncio loop in a background thread and delivers
+    their results to callbacks on the Qt GUI thread
+    """
+
+    # Emitted from the loop thread with (request_id, outcome, value), where
+    # outcome is 'result', 'error' or 'cancelled'; the queued connection
+    # hands it to the GUI thread
+    _finished = pyqtSignal(int, str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._callbacks = {}
+        self._ids = itertools.count(1)
+        self._finished.connect(self._deliver)
+
+        if sys.platform == 'win32':
+            # psycopg's async connections do not support the Proactor loop
+            self.loop = asyncio.SelectorEventLoop()
+        else:
+            self.loop = asyncio.new_event_loop()
+
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine, on_result, on_error=None, on_cancel=None):
+        """
+        Schedule a coroutine on the loop
+        on_result(result), on_error(exception) or, when the returned future
+        is cancelled, on_cancel() is called on the GUI thread. A cancelled
+        query never calls on_result.
+        """
+        request_id = next(self._ids)
+        self._callbacks[request_id] = (on_result, on_error, on_cancel)
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(lambda f: self._emit_finished(request_id, f))
+        return future
+
+    def _emit_finished(self, request_id, future):
+        if future.cancelled():
+            self._finished.emit(request_id, 'cancelled', None)
+        elif future.exception() is not None:
+            self._finished.emit(request_id, 'error', future.exception())
+        else:
+            self._finished.emit(request_id, 'result', future.result())
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the loop and block until it completes"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def _deliver(self, request_id, outcome, value):
+        on_result, on_error, on_cancel = self._callbacks.pop(request_id, (None, None, None))
+        callback = {'result': on_result, 'error': on_error, 'cancelled': on_cancel}[outcome]
+        if callback is None:
+            return
+        if outcome == 'cancelled':
+            callback()
+        else:
+            callback(value)
+
+    def stop(self):
+        """Stop the loop and its thread"""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+        self.loop.close()
+        self._callbacks.clear()
@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Runner - Headless flood, capacity and route assessment without the QGIS dialog
+
+Run from the plugin directory, e.g. nightly from cron:
+    QT_QPA_PLATFORM=offscreen python3 batch_runner.py --output-dir /srv/assessments/latest --save-routes
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from qgis.core import (
+    QgsApplication,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
+    QgsGeometry
+)
+
+if __package__:
+    from .database_manager import DatabaseManager
+    from .evacuation_planner import EvacuationPlanner
+    from .road_network import RoadNetwork
+    from .spatial_analyzer import AreaFeature, start_qgis
+else:
+    from database_manager import DatabaseManager
+    from evacuation_planner import EvacuationPlanner
+    from road_network import RoadNetwork
+    from spatial_analyzer import AreaFeature, start_qgis
+
+
+TASKS = ('flood', 'capacity', 'routes', 'assignment')
+
+# Risk zones that get evacuation routes, compared case-insensitively
+HIGH_RISK_LEVELS = ('HIGH', 'VERY HIGH', 'EXTREME')
+
+# Planar CRS for route distances: WGS 84 / UTM zone 36S covers Malawi
+ROUTE_CRS = 'EPSG:32736'
+
+RISK_AREAS_QUERY = """
+    SELECT
+        zone_id AS area_id,
+        zone_name,
+        risk_level,
+        affected_population,
+        ST_AsBinary(ST_Transform(geom, %s)) AS wkb
+    FROM risk_zones
+    WHERE boundary_id = ANY(%s)
+      AND upper(risk_level) = ANY(%s)
+      AND geom IS NOT NULL
+    ORDER BY zone_id;
+"""
+
+CENTERS_QUERY = """
+    SELECT
+        center_id,
+        center_name,
+        capacity,
+        current_occupancy,
+        ST_AsBinary(ST_Transform(geom, %s)) AS wkb
+    FROM evacuation_centers
+    WHERE geom IS NOT NULL
+    ORDER BY center_id;
+"""
+
+
+def _area_feature(row):
+    """Wrap a query row with a 'wkb' column as a picklable feature for the planner"""
+    attributes = {key: value for key, value in row.items() if key != 'wkb'}
+    return AreaFeature(bytes(row['wkb']), attributes)
+
+
+def load_centers(db_manager, route_crs=ROUTE_CRS):
+    """Get all evacuation centers as features in route_crs"""
+    srid = int(route_crs.split(':')[1])
+    return [_area_feature(row) for row in db_manager.execute_query(CENTERS_QUERY, (srid,))]
+
+
+def load_risk_areas(db_manager, boundary_ids, route_crs=ROUTE_CRS):
+    """Get the high-risk zones of the given districts as features in route_crs"""
+    srid = int(route_crs.split(':')[1])
+    return [
+        _area_feature(row) for row in db_manager.execute_query(
+            RISK_AREAS_QUERY, (srid, list(boundary_ids), list(HIGH_RISK_LEVELS))
+        )
+    ]
+
+
+def assess_district(db_manager, district, tasks, centers, route_crs=ROUTE_CRS,
+                    road_network=None, max_snap_km=2.0):
+    """
+    Capacity and route assessment of one district
+    Routes go from the district's high-risk zones to the nearest center
+    anywhere, so districts near a border can use their neighbours' centers.
+    With a road_network (in route_crs) they follow the roads to the fastest
+    reachable center instead of a straight line.
+    Returns: (capacity row or None, list of routes with EPSG:4326 WKB geometry)
+    """
+    capacity = None
+    routes = []
+
+    if 'capacity' in tasks:
+        district_centers = db_manager.get_evacuation_centers(district['boundary_id'])
+        population = district['population'] or 0
+        total_capacity = sum(c['capacity'] or 0 for c in district_centers)
+        occupancy = sum(c['current_occupancy'] or 0 for c in district_centers)
+
+        capacity = {
+            'boundary_id': district['boundary_id'],
+            'district': district['boundary_name'],
+            'population': population,
+            'evacuation_centers': len(district_centers),
+            'total_capacity': total_capacity,
+            'free_capacity': total_capacity - occupancy,
+            'capacity_gap': population - total_capacity,
+            'coverage_pct': round(total_capacity / population * 100, 1) if population > 0 else 0
+        }
+
+    if 'routes' in tasks and centers:
+        areas = load_risk_areas(db_manager, [district['boundary_id']], route_crs)
+        planner = EvacuationPlanner(db_manager)
+        if road_network is not None:
+            district_routes = planner.calculate_network_routes(areas, centers, road_network, max_snap_km)
+        else:
+            district_routes = planner.calculate_evacuation_routes(areas, centers)
+
+        transform = QgsCoordinateTransform(
+            QgsCoordinateReferenceSystem(route_crs),
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsCoordinateTransformContext()
+        )
+
+        for route in district_routes:
+            geometry = route.pop('geometry')
+            geometry.transform(transform)
+            route.pop('candidates', None)
+            route['district'] = district['boundary_name']
+            route['wkb'] = bytes(geometry.asWkb())
+            routes.append(route)
+
+    return capacity, routes
+
+
+class BatchAssessment:
+    """
+    Flood, capacity and route assessment of many districts in one run
+    Flood risk is one query for all districts. Capacity and routes are
+    assessed per district, on worker processes when workers > 1; each
+    worker opens its own database connection and QGIS instance.
+    With road_table, routes follow that PostGIS line table (see RoadNetwork)
+    in its own CRS. The assignment task places the population of all
+    high-risk zones in centers without exceeding their free capacity.
+    """
+
+    def __init__(self, db_manager, workers=1, route_crs=ROUTE_CRS,
+                 road_table=None, road_speed_column=None, max_snap_km=2.0):
+        self.db = db_manager
+        self.workers = workers
+        self.route_crs = route_crs
+        self.road_table = road_table
+        self.road_speed_column = road_speed_column
+        self.max_snap_km = max_snap_km
+        self.road_network = None
+        self.errors = {}
+
+    def districts(self, names=None):
+        """Get the district rows to assess, all of them when names is empty"""
+        districts = self.db.get_all_districts()
+        if not names:
+            return districts
+
+        by_name = {d['boundary_name']: d for d in districts}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown district(s): {', '.join(unknown)}")
+        return [by_name[name] for name in names]
+
+    def flood_risk(self, districts):
+        """Get flood-prone district rows for the given districts"""
+        ids = {d['boundary_id'] for d in districts}
+        # Nothing refreshes the summary in the background here
+        if self.db.has_flood_summary():
+            self.db.refresh_flood_summary()
+        return [row for row in self.db.get_flood_prone_districts() if row['boundary_id'] in ids]
+
+    def assignment(self, districts):
+        """
+        Capacity-constrained assignment of the districts' high-risk zone
+        populations to all centers, see EvacuationPlanner.assign_evacuees
+        Returns: rows of from_area_id/to_center_id/people/distance_km, plus
+        one row without a center for the people left unplaced per zone
+        """
+        centers = load_centers(self.db, self.route_crs)
+        areas = load_risk_areas(self.db, [d['boundary_id'] for d in districts], self.route_crs)
+        result = EvacuationPlanner(self.db).assign_evacuees(areas, centers)
+
+        rows = list(result['assignments'])
+        for area_id, people in result['unassigned'].items():
+            rows.append({'from_area_id': area_id, 'to_center_id': None, 'people': people, 'distance_km': None})
+        return rows
+
+    def load_road_network(self):
+        """Build the road network from road_table once"""
+        if self.road_network is None:
+            self.road_network = RoadNetwork.from_table(
+                self.db, self.road_table, speed_column=self.road_speed_column
+            )
+        return self.road_network
+
+    def run(self, names=None, tasks=TASKS, save_routes=False, progress_callback=None):
+        """
+        Run the assessment
+        progress_callback(done, total) is called after every district, and
+        districts that fail are listed in self.errors instead of stopping the run.
+        With save_routes the routes are upserted at the end; a missing upsert
+        index raises ValueError before any district is assessed.
+        Returns: dict with 'flood', 'capacity', 'routes' and 'assignment' row lists
+        """
+        districts = self.districts(names)
+        if save_routes and 'routes' in tasks:
+            self.check_route_saving()
+        results = {'flood': [], 'capacity': [], 'routes': [], 'assignment': []}
+        self.errors = {}
+
+        if 'flood' in tasks:
+            results['flood'] = self.flood_risk(districts)
+
+        if 'assignment' in tasks:
+            results['assignment'] = self.assignment(districts)
+
+        if 'capacity' in tasks or 'routes' in tasks:
+            # Road routes are computed in the road table's CRS
+            route_crs = self.route_crs
+            if self.road_table and 'routes' in tasks:
+                route_crs = self.load_road_network().crs.authid()
+
+            centers = load_centers(self.db, route_crs) if 'routes' in tasks else []
+            for capacity, routes in self._assess(districts, tasks, centers, route_crs, progress_callback):
+                if capacity:
+                    results['capacity'].append(capacity)
+                results['routes'].extend(routes)
+
+            results['capacity'].sort(key=lambda row: row['district'])
+
+        if save_routes and results['routes']:
+            self.save_routes(results['routes'])
+
+        return results
+
+    def check_route_saving(self):
+        """Raise ValueError when routes cannot be upserted into evacuation_routes"""
+        if not EvacuationPlanner(self.db).has_route_conflict_index():
+            raise ValueError(
+                "Saving routes needs the unique index on evacuation_routes "
+                "(from_area_id, to_center_id); run schema_migrations.py to apply migration 004"
+            )
+
+    def save_routes(self, routes):
+        """Upsert result routes into evacuation_routes, returns the planner's write stats"""
+        return EvacuationPlanner(self.db).save_evacuation_routes_to_db(
+            [dict(route, geometry=_geometry(route['wkb'])) for route in routes],
+            upsert=True
+        )
+
+    def _assess(self, districts, tasks, centers, route_crs, progress_callback):
+        total = len(districts)
+        done = 0
+
+        if self.workers == 1 or total < 2:
+            for district in districts:
+                try:
+                    yield assess_district(
+                        self.db, district, tasks, centers, route_crs, self.road_network, self.max_snap_km
+                    )
+                except Exception as e:
+                    self.errors[district['boundary_name']] = str(e)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.db.connection_params, centers, QgsApplication.prefixPath(),
+                      self.road_table if self.road_network else None, self.road_speed_column)
+        ) as executor:
+            futures = {
+                executor.submit(_assess_in_worker, district, tasks, route_crs, self.max_snap_km): district
+                for district in districts
+            }
+
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    self.errors[futures[future]['boundary_name']] = str(e)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+
+
+def _geometry(wkb):
+    geometry = QgsGeometry()
+    geometry.fromWkb(wkb)
+    return geometry
+
+
+# State of a BatchAssessment worker process
+_worker = {}
+
+
+def _init_worker(connection_params, centers, prefix_path=None, road_table=None, road_speed_column=None):
+    """Give a worker process its own QGIS instance, database connection and road network"""
+    app = start_qgis(prefix_path)
+
+    db = DatabaseManager()
+    success, message = db.connect(**connection_params)
+    if not success:
+        raise Exception(message)
+
+    network = RoadNetwork.from_table(db, road_table, speed_column=road_speed_column) if road_table else None
+    _worker.update(app=app, db=db, centers=centers, network=network)
+
+
+def _assess_in_worker(district, tasks, route_crs, max_snap_km):
+    return assess_district(
+        _worker['db'], district, tasks, _worker['centers'], route_crs, _worker['network'], max_snap_km
+    )
+
+
+def write_csv(rows, filename, geometry_key=None):
+    """Write row dicts to CSV; a WKB geometry_key column is written as a wkt column"""
+    if not rows:
+        return 0
+
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for row in rows:
+            row = dict(row)
+            if geometry_key:
+                row['wkt'] = _geometry(row.pop(geometry_key)).asWkt()
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+    return len(rows)
+
+
+def write_results(results, output_dir):
+    """Write one CSV per result set, returns {filename: rows}"""
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    for name, filename, geometry_key in (
+        ('flood', 'flood_risk.csv', None),
+        ('capacity', 'evacuation_capacity.csv', None),
+        ('routes', 'evacuation_routes.csv', 'wkb'),
+        ('assignment', 'evacuation_assignment.csv', None)
+    ):
+        if results[name]:
+            path = os.path.join(output_dir, filename)
+            written[path] = write_csv(results[name], path, geometry_key)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the disaster risk assessment without the QGIS dialog")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--database', default='disaster_risk_db')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD', ''),
+                        help="Defaults to $PGPASSWORD")
+    parser.add_argument('--districts', nargs='+', metavar='NAME',
+                        help="Districts to assess (default: all)")
+    parser.add_argument('--tasks', default=','.join(TASKS),
+                        help="Comma separated subset of: " + ', '.join(TASKS))
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for the per-district work (0: one per CPU)")
+    parser.add_argument('--roads', metavar='TABLE',
+                        help="Route along this PostGIS line table instead of straight lines")
+    parser.add_argument('--road-speed-column',
+                        help="Speed column in km/h of the --roads table (default: walking speed)")
+    parser.add_argument('--max-snap-km', type=float, default=2.0,
+                        help="Furthest a zone or center may lie from a road node (default: 2)")
+    parser.add_argument('--output-dir', help="Write flood_risk.csv, evacuation_capacity.csv, "
+                                             "evacuation_routes.csv and evacuation_assignment.csv here")
+    parser.add_argument('--save-routes', action='store_true',
+                        help="Upsert the routes into the evacuation_routes table")
+    args = parser.parse_args(argv)
+
+    tasks = [task.strip() for task in args.tasks.split(',') if task.strip()]
+    unknown = [task for task in tasks if task not in TASKS]
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+
+    app = start_qgis()
+    db = DatabaseManager()
+    start = time.perf_counter()
+    try:
+        success, message = db.connect(args.host, args.port, args.database, args.user, args.password)
+        if not success:
+            print(message, file=sys.stderr)
+            return 2
+
+        assessment = BatchAssessment(
+            db,
+            workers=args.workers,
+            road_table=args.roads,
+            road_speed_column=args.road_speed_column,
+            max_snap_km=args.max_snap_km
+        )
+        save_routes = args.save_routes and 'routes' in tasks
+        try:
+            if save_routes:
+                assessment.check_route_saving()
+            # Routes are saved after the CSVs are written, see below
+            results = assessment.run(args.districts, tasks)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+
+        if 'flood' in tasks:
+            displaced = sum(row['total_people_displaced'] or 0 for row in results['flood'])
+            print(f"✓ Flood risk: {len(results['flood'])} flood-prone district(s), "
+                  f"{displaced:,} people displaced historically")
+        if 'capacity' in tasks:
+            short = [row['district'] for row in results['capacity'] if row['capacity_gap'] > 0]
+            print(f"✓ Capacity: {len(results['capacity'])} district(s), "
+                  f"{len(short)} with insufficient capacity")
+        if 'routes' in tasks:
+            print(f"✓ Routes: {len(results['routes'])} evacuation route(s)"
+                  + (f" along {args.roads}" if args.roads else ""))
+        if 'assignment' in tasks:
+            placed = sum(row['people'] for row in results['assignment'] if row['to_center_id'] is not None)
+            unplaced = sum(row['people'] for row in results['assignment'] if row['to_center_id'] is None)
+            print(f"✓ Assignment: {placed:,} people placed in centers, {unplaced:,} without a place")
+
+        if args.output_dir:
+            for path, rows in write_results(results, args.output_dir).items():
+                print(f"✓ Wrote {rows} row(s) to {path}")
+
+        failed = bool(assessment.errors)
+        if save_routes and results['routes']:
+            try:
+                saved = assessment.save_routes(results['routes'])
+                print(f"✓ Saved {saved['rows']} route(s) to evacuation_routes")
+            except Exception as e:
+                print(f"✗ Saving routes failed: {e}", file=sys.stderr)
+                failed = True
+
+        for district, error in sorted(assessment.errors.items()):
+            print(f"✗ {district}: {error}", file=sys.stderr)
+
+        print(f"Finished in {time.perf_counter() - start:.1f}s")
+        return 1 if failed else 0
+    finally:
+        db.close()
+        app.exitQgis()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark - District summary join fan-out
+
+Builds a synthetic copy of administrative_boundaries, disaster_events and
+water_bodies in a scratch schema, then compares the old single-level join
+against the pre-aggregated queries in database_manager.QUERIES:
+rows fed into the aggregation, latency, and whether the totals are inflated.
+
+Usage:
+    python benchmarks/district_summary_fanout.py --password secret --events 200000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_manager import DatabaseManager
+
+
+SCHEMA = 'bench_fanout'
+
+# get_flood_prone_districts before the pre-aggregation fix
+FAN_OUT_FLOOD_QUERY = """
+SELECT
+    ab.boundary_id,
+    ab.boundary_name as district,
+    COUNT(DISTINCT de.event_id) as total_flood_events,
+    SUM(de.casualties) as total_casualties,
+    SUM(de.displaced_people) as total_people_displaced,
+    STRING_AGG(DISTINCT wb.water_name, ', ') as flood_prone_rivers,
+    COUNT(DISTINCT wb.water_id) as num_flood_prone_waters
+FROM administrative_boundaries ab
+LEFT JOIN disaster_events de
+    ON ab.boundary_name = de.affected_area
+    AND de.event_type = 'flood'
+LEFT JOIN water_bodies wb
+    ON ab.boundary_id = wb.boundary_id
+    AND wb.flood_prone = TRUE
+GROUP BY ab.boundary_id, ab.boundary_name
+HAVING COUNT(DISTINCT de.event_id) > 0 OR COUNT(DISTINCT wb.water_id) > 0
+"""
+
+# get_district_summary before the fix
+FAN_OUT_DISTRICT_QUERY = """
+SELECT
+    ab.boundary_name,
+    COUNT(DISTINCT de.event_id) as historical_events,
+    COUNT(DISTINCT wb.water_id) as water_bodies,
+    SUM(de.casualties) as total_casualties
+FROM administrative_boundaries ab
+LEFT JOIN disaster_events de ON ab.boundary_name = de.affected_area
+LEFT JOIN water_bodies wb ON ab.boundary_id = wb.boundary_id
+WHERE ab.boundary_name = %s
+GROUP BY ab.boundary_id, ab.boundary_name
+"""
+
+FAN_OUT_JOIN_ROWS = """
+SELECT COUNT(*) AS join_rows
+FROM administrative_boundaries ab
+LEFT JOIN disaster_events de
+    ON ab.boundary_name = de.affected_area
+    AND de.event_type = 'flood'
+LEFT JOIN water_bodies wb
+    ON ab.boundary_id = wb.boundary_id
+    AND wb.flood_prone = TRUE
+"""
+
+PRE_AGGREGATED_JOIN_ROWS = """
+SELECT
+    (SELECT COUNT(*) FROM disaster_events WHERE event_type = 'flood')
+    + (SELECT COUNT(*) FROM water_bodies WHERE flood_prone = TRUE)
+    + (SELECT COUNT(*) FROM administrative_boundaries) AS join_rows
+"""
+
+
+def create_synthetic_data(db, districts, events, waters_per_district):
+    """Create the scratch schema and fill it with synthetic rows"""
+    db.execute_query(f"""
+        DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+        CREATE SCHEMA {SCHEMA};
+
+        CREATE TABLE {SCHEMA}.administrative_boundaries AS
+        SELECT
+            g AS boundary_id,
+            'District ' || g AS boundary_name,
+            'district'::varchar AS boundary_type,
+            'D' || g AS boundary_code,
+            (50000 + random() * 1000000)::int AS population,
+            (500 + random() * 5000)::numeric(10,2) AS area_sqkm
+        FROM generate_series(1, %(districts)s) g;
+
+        CREATE TABLE {SCHEMA}.water_bodies AS
+        SELECT
+            g AS water_id,
+            'River ' || g AS water_name,
+            'river'::varchar AS water_type,
+            random() < 0.6 AS flood_prone,
+            1 + (g %% %(districts)s) AS boundary_id
+        FROM generate_series(1, %(districts)s * %(waters)s) g;
+
+        CREATE TABLE {SCHEMA}.disaster_events AS
+        SELECT
+            g AS event_id,
+            (ARRAY['flood', 'flood', 'drought', 'storm'])[1 + (g %% 4)]::varchar AS event_type,
+            (DATE '1990-01-01' + (random() * 12000)::int) AS event_date,
+            (ARRAY['minor', 'moderate', 'severe', 'catastrophic'])[1 + (g %% 4)]::varchar AS severity,
+            'District ' || (1 + (g %% %(districts)s)) AS affected_area,
+            1 + (g %% %(districts)s) AS boundary_id,
+            (random() * 20)::int AS casualties,
+            (random() * 5000)::int AS displaced_people,
+            (random() * 1000000)::numeric(15,2) AS economic_loss_usd
+        FROM generate_series(1, %(events)s) g;
+
+        ANALYZE {SCHEMA}.administrative_boundaries;
+        ANALYZE {SCHEMA}.water_bodies;
+        ANALYZE {SCHEMA}.disaster_events;
+    """, {'districts': districts, 'events': events, 'waters': waters_per_district}, fetch=False)
+
+
+def time_call(func, repeat):
+    """Median wall time of func() in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(db, repeat):
+    """Compare the fan-out and pre-aggregated flood-prone queries"""
+    db.execute_query(f"SET search_path TO {SCHEMA}, public", fetch=False)
+
+    fan_out_rows = db.execute_query(FAN_OUT_JOIN_ROWS)[0]['join_rows']
+    pre_aggregated_rows = db.execute_query(PRE_AGGREGATED_JOIN_ROWS)[0]['join_rows']
+
+    fan_out_ms = time_call(lambda: db.execute_query(FAN_OUT_FLOOD_QUERY), repeat)
+    pre_aggregated_ms = time_call(lambda: db.get_flood_prone_districts(use_summary=False), repeat)
+
+    summary_fan_out_ms = time_call(
+        lambda: db.execute_query(FAN_OUT_DISTRICT_QUERY, ('District 1',)), repeat
+    )
+    summary_ms = time_call(lambda: db.get_district_summary('District 1'), repeat)
+
+    # Totals from the fan-out join are multiplied by the number of water bodies
+    old = {r['boundary_id']: r['total_casualties'] for r in db.execute_query(FAN_OUT_FLOOD_QUERY)}
+    new = {r['boundary_id']: r['total_casualties'] for r in db.get_flood_prone_districts(use_summary=False)}
+    inflated = sum(1 for boundary_id, total in new.items() if old.get(boundary_id) != total)
+
+    return {
+        'fan_out_join_rows': fan_out_rows,
+        'pre_aggregated_rows': pre_aggregated_rows,
+        'flood_prone_fan_out_ms': fan_out_ms,
+        'flood_prone_pre_aggregated_ms': pre_aggregated_ms,
+        'district_fan_out_ms': summary_fan_out_ms,
+        'district_summary_ms': summary_ms,
+        'districts_with_inflated_totals': inflated
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--database', default='disaster_risk_db')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--districts', type=int, default=28)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--waters-per-district', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    success, message = db.connect(args.host, args.port, args.database, args.user, args.password)
+    if not success:
+        sys.exit(message)
+
+    try:
+        print(f"Generating {args.events:,} events, {args.districts * args.waters_per_district:,} water bodies...")
+        create_synthetic_data(db, args.districts, args.events, args.waters_per_district)
+
+        results = run_benchmark(db, args.repeat)
+
+        print("\n" + "="*60)
+        print("DISTRICT SUMMARY FAN-OUT BENCHMARK")
+        print("="*60)
+        print(f"Rows aggregated:    {results['fan_out_join_rows']:>12,} -> {results['pre_aggregated_rows']:,}")
+        print(f"Flood-prone query:  {results['flood_prone_fan_out_ms']:>10.1f} ms -> "
+              f"{results['flood_prone_pre_aggregated_ms']:.1f} ms")
+        print(f"District summary:   {results['district_fan_out_ms']:>10.1f} ms -> "
+              f"{results['district_summary_ms']:.1f} ms")
+        print(f"Districts whose fan-out totals were inflated: {results['districts_with_inflated_totals']}")
+        print("="*60)
+    finally:
+        if not args.keep:
+            db.execute_query("SET search_path TO public", fetch=False)
+            db.execute_query(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE", fetch=False)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
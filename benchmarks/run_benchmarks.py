@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite - Queries, risk analysis and evacuation routing on synthetic data
+
+Generates a synthetic dataset (see synthetic_data.py) in a scratch schema,
+then times every DatabaseManager query, each DisasterRiskAnalyzer.analyze_*
+component and the EvacuationPlanner routing, and writes the timings to
+JSON. Pass the JSON of an earlier run with --compare to see the change per
+benchmark; the exit status is 1 when any of them got slower than
+--threshold.
+
+The analysis and routing groups need the QGIS Python bindings, NumPy and
+GDAL; --groups queries runs with psycopg2 alone. A throwaway PostGIS
+instance is enough:
+    docker run --rm -d -p 5434:5432 -e POSTGRES_PASSWORD=bench postgis/postgis
+    python benchmarks/run_benchmarks.py --port 5434 --database postgres --password bench \\
+        --scale malawi --keep --output baseline.json
+    python benchmarks/run_benchmarks.py --port 5434 --database postgres --password bench \\
+        --scale malawi --reuse --compare baseline.json --output after.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_manager import DatabaseManager
+from synthetic_data import (
+    DEM_CRS,
+    SCALES,
+    SCHEMA,
+    create_synthetic_data,
+    drop_synthetic_data,
+    row_counts,
+    scale_for,
+    write_elevation_raster
+)
+
+
+GROUPS = ('queries', 'analysis', 'routing')
+
+# Search radius of the area event queries, in degrees (about 5 km)
+EVENT_DISTANCE = 0.05
+
+AREAS_QUERY = """
+    SELECT
+        zone_id AS area_id,
+        affected_population AS population,
+        ST_AsBinary(geom) AS wkb,
+        ST_AsBinary(ST_Transform(geom, %(srid)s)) AS planar_wkb
+    FROM risk_zones
+    WHERE %(high_risk)s = FALSE OR risk_level IN ('High', 'Very High')
+    ORDER BY zone_id
+    LIMIT %(limit)s;
+"""
+
+CENTERS_QUERY = """
+    SELECT
+        center_id,
+        capacity,
+        current_occupancy,
+        ST_AsBinary(geom) AS wkb,
+        ST_AsBinary(ST_Transform(geom, %(srid)s)) AS planar_wkb
+    FROM evacuation_centers
+    ORDER BY center_id;
+"""
+
+
+def measure(func, repeat, setup=None):
+    """
+    Time func() repeat times after one warm-up call
+    setup() runs before every call and is not timed, e.g. to clear caches.
+    Returns: dict with median_ms, min_ms, max_ms, runs and rows (the
+    length of the result, or the result itself when it is a count)
+    """
+    if setup:
+        setup()
+    result = func()
+
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'runs': repeat,
+        'rows': result if isinstance(result, int) else len(result) if hasattr(result, '__len__') else None
+    }
+
+
+def query_benchmarks(db, repeat, area_count):
+    """Time every DatabaseManager query on the district with the most events"""
+    district = db.execute_query("""
+        SELECT ab.boundary_id, ab.boundary_name
+        FROM administrative_boundaries ab
+        JOIN disaster_events de ON de.boundary_id = ab.boundary_id
+        GROUP BY ab.boundary_id, ab.boundary_name
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """)[0]
+    district_id = district['boundary_id']
+    district_name = district['boundary_name']
+
+    areas = db.execute_query(AREAS_QUERY, {'srid': 4326, 'high_risk': False, 'limit': area_count})
+    area_wkbs = {row['area_id']: bytes(row['wkb']) for row in areas}
+    first_wkb = next(iter(area_wkbs.values()))
+
+    cases = {
+        'flood_prone_districts': lambda: db.get_flood_prone_districts(use_summary=False),
+        'district_by_river': lambda: db.get_district_by_river('River 1'),
+        'historical_events_in_district': lambda: db.get_historical_events_in_district(district_name),
+        'historical_events_in_district_stream': lambda: list(
+            db.get_historical_events_in_district(district_name, stream=True)
+        ),
+        'all_districts': lambda: db.get_all_districts(),
+        'infrastructure_in_district': lambda: db.get_infrastructure_in_district(district_id),
+        'evacuation_centers': lambda: db.get_evacuation_centers(),
+        'evacuation_centers_by_district': lambda: db.get_evacuation_centers(district_id),
+        'risk_zones': lambda: db.get_risk_zones(),
+        'risk_zones_by_level': lambda: db.get_risk_zones('High'),
+        'district_summary': lambda: [db.get_district_summary(district_name)],
+        'population_data': lambda: db.get_population_data(district_id),
+        'historical_events_in_area': lambda: db.get_historical_events_in_area(first_wkb, EVENT_DISTANCE),
+        'historical_events_in_areas': lambda: db.get_historical_events_in_areas(area_wkbs, EVENT_DISTANCE)
+    }
+
+    results = {}
+    for name, func in cases.items():
+        setup = db.clear_event_cache if name.startswith('historical_events_in_area') else None
+        results[name] = measure(func, repeat, setup)
+        print(f"  queries.{name:<40} {results[name]['median_ms']:>10.1f} ms")
+    return results
+
+
+def memory_layer(name, geometry_type, rows, fields, crs=DEM_CRS):
+    """Build a QGIS memory layer from rows with a planar_wkb column"""
+    from qgis.core import QgsFeature, QgsGeometry, QgsVectorLayer
+
+    uri = f"{geometry_type}?crs={crs}" + ''.join(f"&field={field}:{kind}" for field, kind in fields)
+    layer = QgsVectorLayer(uri, name, 'memory')
+
+    features = []
+    for row in rows:
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes([row[field] for field, _ in fields])
+        geometry = QgsGeometry()
+        geometry.fromWkb(bytes(row['planar_wkb']))
+        feature.setGeometry(geometry)
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    return layer
+
+
+def area_features(rows, column):
+    """Picklable area features from rows, with the geometry from column"""
+    from spatial_analyzer import AreaFeature
+
+    return [
+        AreaFeature(bytes(row[column]), {key: value for key, value in row.items() if not key.endswith('wkb')})
+        for row in rows
+    ]
+
+
+def analysis_benchmarks(db, repeat, area_count, dem_path):
+    """
+    Time each DisasterRiskAnalyzer component over area_count risk zones
+    Geometric components run in the DEM's planar CRS, the historical event
+    components in EPSG:4326 like the database.
+    """
+    from qgis.core import QgsRasterLayer
+    from spatial_analyzer import DisasterRiskAnalyzer
+
+    srid = int(DEM_CRS.split(':')[1])
+    rows = db.execute_query(AREAS_QUERY, {'srid': srid, 'high_risk': False, 'limit': area_count})
+    planar = {area.attributes['area_id']: area.geometry() for area in area_features(rows, 'planar_wkb')}
+    geographic = {area.attributes['area_id']: area.geometry() for area in area_features(rows, 'wkb')}
+
+    elevation = QgsRasterLayer(dem_path, 'elevation')
+    water = memory_layer('water_bodies', 'MultiLineString', db.execute_query(
+        "SELECT water_id, ST_AsBinary(ST_Transform(geom, %s)) AS planar_wkb FROM water_bodies", (srid,)
+    ), [('water_id', 'integer')])
+    soil = memory_layer('landuse', 'MultiPolygon', db.execute_query(
+        "SELECT drainage_capacity, ST_AsBinary(ST_Transform(geom, %s)) AS planar_wkb FROM soil_data", (srid,)
+    ), [('drainage_capacity', 'string')])
+
+    analyzer = DisasterRiskAnalyzer(db)
+    events = db.get_historical_events_in_areas(geographic, EVENT_DISTANCE)
+
+    cases = {
+        'analyze_elevation_risk': (
+            lambda: [analyzer.analyze_elevation_risk(geometry, elevation) for geometry in planar.values()], None
+        ),
+        'analyze_elevation_risk_batch': (lambda: analyzer.analyze_elevation_risk_batch(planar, elevation), None),
+        'get_water_rings': (lambda: analyzer.get_water_rings(water), analyzer.clear_water_rings),
+        'analyze_water_proximity': (
+            lambda: [analyzer.analyze_water_proximity(geometry, water) for geometry in planar.values()], None
+        ),
+        'analyze_slope': (
+            lambda: [analyzer.analyze_slope(geometry, elevation) for geometry in planar.values()], None
+        ),
+        'analyze_historical_events': (
+            lambda: [
+                analyzer.analyze_historical_events(geometry, area_id) for area_id, geometry in geographic.items()
+            ],
+            db.clear_event_cache
+        ),
+        'analyze_historical_events_batch': (
+            lambda: analyzer.analyze_historical_events_batch(geographic), db.clear_event_cache
+        ),
+        'score_historical_events': (lambda: analyzer.score_historical_events(events), None),
+        'analyze_rainfall_risk': (
+            lambda: [analyzer.analyze_rainfall_risk(geometry, None) for geometry in planar.values()], None
+        ),
+        'analyze_drainage_capacity': (
+            lambda: [analyzer.analyze_drainage_capacity(geometry, soil) for geometry in planar.values()], None
+        )
+    }
+
+    results = {}
+    for name, (func, setup) in cases.items():
+        results[name] = measure(func, repeat, setup)
+        results[name]['areas'] = len(planar)
+        print(f"  analysis.{name:<39} {results[name]['median_ms']:>10.1f} ms")
+    return results
+
+
+def routing_benchmarks(db, repeat, area_count, schema, road_spacing):
+    """Time straight-line, capacity-constrained and road network routing from high-risk zones"""
+    from evacuation_planner import EvacuationPlanner
+    from road_network import RoadNetwork
+
+    srid = int(DEM_CRS.split(':')[1])
+    area_rows = db.execute_query(AREAS_QUERY, {'srid': srid, 'high_risk': True, 'limit': area_count})
+    center_rows = db.execute_query(CENTERS_QUERY, {'srid': srid})
+
+    areas = area_features(area_rows, 'planar_wkb')
+    centers = area_features(center_rows, 'planar_wkb')
+    geographic_areas = area_features(area_rows, 'wkb')
+    geographic_centers = area_features(center_rows, 'wkb')
+    populations = {row['area_id']: row['population'] or 0 for row in area_rows}
+
+    planner = EvacuationPlanner(db)
+    network = RoadNetwork.from_table(db, f"{schema}.roads", speed_column='speed_kmh')
+    # Zone centroids lie up to half a road grid cell diagonal (in km) from a road node
+    max_snap_km = road_spacing * 111 * 0.75
+    network_routes = planner.calculate_network_routes(
+        geographic_areas, geographic_centers, network, max_snap_km=max_snap_km
+    )
+
+    cases = {
+        'calculate_evacuation_routes': lambda: planner.calculate_evacuation_routes(areas, centers),
+        'calculate_evacuation_routes_k5': lambda: planner.calculate_evacuation_routes(areas, centers, k=5),
+        'assign_evacuees': lambda: planner.assign_evacuees(areas, centers, populations=populations)['assignments'],
+        'road_network_from_table': lambda: RoadNetwork.from_table(
+            db, f"{schema}.roads", speed_column='speed_kmh'
+        ).node_count,
+        'calculate_network_routes': lambda: planner.calculate_network_routes(
+            geographic_areas, geographic_centers, network, max_snap_km=max_snap_km
+        ),
+        'save_evacuation_routes_to_db': lambda: planner.save_evacuation_routes_to_db(
+            network_routes, upsert=True
+        )['rows']
+    }
+
+    results = {}
+    for name, func in cases.items():
+        results[name] = measure(func, repeat)
+        results[name]['areas'] = len(areas)
+        print(f"  routing.{name:<40} {results[name]['median_ms']:>10.1f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every benchmark against a baseline run
+    Returns: names of benchmarks slower than threshold times the baseline
+    """
+    if baseline['meta']['scale'] != results['meta']['scale']:
+        print("⚠ The baseline was run at a different scale")
+
+    regressions = []
+    print(f"\n{'benchmark':<52} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if not before:
+            print(f"{name:<52} {'-':>10} {result['median_ms']:>8.1f}ms {'new':>8}")
+            continue
+
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+        # Sub-millisecond differences are noise
+        slower = ratio > threshold and result['median_ms'] - before['median_ms'] > 1
+        if slower:
+            regressions.append(name)
+        print(f"{name:<52} {before['median_ms']:>8.1f}ms {result['median_ms']:>8.1f}ms "
+              f"{ratio:>7.2f}x{' ✗' if slower else ''}")
+    return regressions
+
+
+def run_metadata(db, scale, args, counts, generation_seconds):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    versions = db.execute_query("SELECT version() AS postgres, postgis_lib_version() AS postgis")[0]
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'postgres': versions['postgres'],
+        'postgis': versions['postgis'],
+        'scale': scale,
+        'rows': counts,
+        'repeat': args.repeat,
+        'areas': args.areas,
+        'generation_seconds': generation_seconds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--database', default='disaster_risk_db')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--schema', default=SCHEMA)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in SCALES['small']:
+        parser.add_argument('--' + name.replace('_', '-'), type=type(SCALES['small'][name]),
+                            help=f"Override the preset's {name}")
+    parser.add_argument('--groups', default=','.join(GROUPS),
+                        help="Comma separated subset of: " + ', '.join(GROUPS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--areas', type=int, default=200,
+                        help="Risk zones used by the area query, analysis and routing benchmarks")
+    parser.add_argument('--dem-pixel', type=int, default=500, help="Synthetic DEM pixel size in metres")
+    parser.add_argument('--reuse', action='store_true', help="Reuse existing synthetic data in --schema")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch schema afterwards")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Slowdown ratio reported as a regression (default 1.2)")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.groups.split(',') if group.strip()]
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(unknown)}")
+
+    scale = scale_for(args.scale, **{name: getattr(args, name) for name in SCALES['small']})
+
+    db = DatabaseManager()
+    success, message = db.connect(args.host, args.port, args.database, args.user, args.password)
+    if not success:
+        sys.exit(message)
+
+    app = None
+    try:
+        counts = row_counts(db, args.schema) if args.reuse else None
+        generation_seconds = None
+        if counts is None:
+            print(f"Generating synthetic data in {args.schema}...")
+            start = time.perf_counter()
+            counts = create_synthetic_data(db, scale, args.schema)
+            generation_seconds = round(time.perf_counter() - start, 1)
+
+        db.execute_query(f"SET search_path TO {args.schema}, public", fetch=False)
+
+        results = {'meta': run_metadata(db, scale, args, counts, generation_seconds), 'benchmarks': {}}
+
+        if 'queries' in groups:
+            for name, result in query_benchmarks(db, args.repeat, args.areas).items():
+                results['benchmarks'][f"queries.{name}"] = result
+
+        if 'analysis' in groups or 'routing' in groups:
+            # Imported here so --groups queries runs without the QGIS bindings
+            from spatial_analyzer import start_qgis
+            app = start_qgis()
+
+        if 'analysis' in groups:
+            with tempfile.TemporaryDirectory() as directory:
+                dem_path = write_elevation_raster(os.path.join(directory, 'dem.tif'), args.dem_pixel)
+                for name, result in analysis_benchmarks(db, args.repeat, args.areas, dem_path).items():
+                    results['benchmarks'][f"analysis.{name}"] = result
+
+        if 'routing' in groups:
+            for name, result in routing_benchmarks(
+                db, args.repeat, args.areas, args.schema, scale['road_spacing']
+            ).items():
+                results['benchmarks'][f"routing.{name}"] = result
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, default=str)
+            print(f"✓ Wrote {len(results['benchmarks'])} results to {args.output}")
+
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare(results, json.load(f), args.threshold)
+            if regressions:
+                print(f"\n✗ {len(regressions)} regression(s): {', '.join(regressions)}")
+                sys.exit(1)
+    finally:
+        if not args.keep:
+            drop_synthetic_data(db, args.schema)
+        db.close()
+        if app:
+            app.exitQgis()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark - Plugin startup import cost
+
+Imports the plugin in a fresh interpreter with -X importtime, the way QGIS
+loads it at startup (classFactory imports disaster_risk_assessment), then
+the modules that are deferred until the dialog is opened or a feature is
+used. Reports the import time of each plugin module and heavy dependency
+in the phase where it is paid. qgis.core, qgis.gui and the Qt widgets are
+imported first and left out, since QGIS has loaded them already.
+
+Usage:
+    python benchmarks/startup_imports.py --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(PLUGIN_DIR)
+
+# Already imported by QGIS before any plugin loads
+PRELOADED = ['qgis.core', 'qgis.gui', 'qgis.PyQt.QtCore', 'qgis.PyQt.QtGui', 'qgis.PyQt.QtWidgets']
+
+# What QGIS imports to call classFactory
+PLUGIN_LOAD = ['', '.disaster_risk_assessment']
+
+# Imported on first use: opening the dialog, running an analysis or an
+# export, connecting, async queries and the headless/analysis modules
+FIRST_USE = [
+    '.disaster_risk_dialog',
+    '.analysis_tasks',
+    '.result_exporter',
+    '.async_database_manager',
+    '.spatial_analyzer',
+    '.evacuation_planner',
+    '.road_network'
+]
+
+# Third-party modules worth reporting wherever they show up
+HEAVY = ('psycopg2', 'psycopg', 'processing', 'pyarrow', 'osgeo')
+
+SCRIPT = """
+import importlib, sys
+sys.path.insert(0, {parent!r})
+for name in {preloaded!r}:
+    importlib.import_module(name)
+sys.stderr.write('--- plugin load\\n')
+for name in {plugin_load!r}:
+    importlib.import_module({package!r} + name)
+sys.stderr.write('--- first use\\n')
+for name in {first_use!r}:
+    importlib.import_module({package!r} + name)
+importlib.import_module({package!r} + '.database_manager')._import_psycopg2()
+"""
+
+
+def run_importtime(python):
+    """Run the import script, returns its -X importtime stderr"""
+    script = SCRIPT.format(
+        parent=os.path.dirname(PLUGIN_DIR),
+        package=PACKAGE,
+        preloaded=PRELOADED,
+        plugin_load=PLUGIN_LOAD,
+        first_use=FIRST_USE
+    )
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', script],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr.strip().splitlines()[-1])
+    return result.stderr
+
+
+def parse_importtime(output):
+    """
+    Split -X importtime output into phases
+    Returns: dict of phase -> {'total_ms', 'modules': {module: cumulative_ms}}
+    """
+    phases = {}
+    phase = None
+    for line in output.splitlines():
+        if line.startswith('--- '):
+            phase = line[4:]
+            phases[phase] = {'total_ms': 0.0, 'modules': {}}
+            continue
+        if phase is None or not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        _, cumulative, module = line[len('import time:'):].split('|')
+        name = module.strip()
+        cumulative_ms = int(cumulative) / 1000
+
+        # Only top-level imports count towards the phase total, nested ones
+        # are already included in their parent's cumulative time
+        if not module[1:].startswith(' '):
+            phases[phase]['total_ms'] += cumulative_ms
+
+        if name == PACKAGE or name.startswith(PACKAGE + '.') or name in HEAVY:
+            phases[phase]['modules'][name] = cumulative_ms
+    return phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--python', default=sys.executable,
+                        help="Interpreter with the QGIS Python bindings")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    phases = parse_importtime(run_importtime(args.python))
+
+    print("\n" + "="*60)
+    print("PLUGIN STARTUP IMPORT COST")
+    print("="*60)
+    for phase, report in phases.items():
+        print(f"{phase}: {report['total_ms']:.1f} ms")
+        for name, ms in sorted(report['modules'].items(), key=lambda item: -item[1]):
+            print(f"  {name:<50} {ms:>8.1f} ms")
+    print("="*60)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(phases, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark - Synthetic Malawi-scale data generator
+
+Creates the plugin's tables in a scratch schema and fills them with
+generated rows at a configurable scale. Districts tile the Malawi bounding
+box, and every other row is placed at a random point inside its district,
+so spatial and boundary_id joins behave like the real data. Flood events
+are skewed towards the first districts, as they are towards the Shire
+valley. Indexes follow the baseline schema plus migrations 003 and 004.
+Also writes a synthetic DEM GeoTIFF for the elevation analysis.
+
+Usage:
+    python benchmarks/synthetic_data.py --password secret --scale malawi --keep
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_manager import DatabaseManager
+
+
+SCHEMA = 'bench_malawi'
+
+# lon/lat bounding box of Malawi
+MALAWI_BBOX = (32.67, -17.13, 35.92, -9.37)
+
+# Planar CRS of the DEM: WGS 84 / UTM zone 36S
+DEM_CRS = 'EPSG:32736'
+
+DISTRICT_NAMES = [
+    'Nsanje', 'Chikwawa', 'Thyolo', 'Mulanje', 'Phalombe', 'Blantyre', 'Chiradzulu',
+    'Mwanza', 'Neno', 'Zomba', 'Machinga', 'Balaka', 'Mangochi', 'Ntcheu', 'Dedza',
+    'Salima', 'Lilongwe', 'Mchinji', 'Dowa', 'Ntchisi', 'Kasungu', 'Nkhotakota',
+    'Mzimba', 'Nkhata Bay', 'Likoma', 'Rumphi', 'Karonga', 'Chitipa'
+]
+
+SCALES = {
+    'small': {
+        'districts': 28,
+        'risk_zones': 1000,
+        'events': 20000,
+        'rainfall': 10000,
+        'centers': 500,
+        'infrastructure': 2000,
+        'water_bodies': 560,
+        'soil_zones': 280,
+        'road_spacing': 0.1
+    },
+    'malawi': {
+        'districts': 28,
+        'risk_zones': 10000,
+        'events': 1000000,
+        'rainfall': 100000,
+        'centers': 5000,
+        'infrastructure': 20000,
+        'water_bodies': 2800,
+        'soil_zones': 1400,
+        'road_spacing': 0.05
+    }
+}
+
+# A random point inside district ab's bounding box
+RANDOM_POINT = """ST_SetSRID(ST_MakePoint(
+    ST_XMin(ab.geom) + random() * (ST_XMax(ab.geom) - ST_XMin(ab.geom)),
+    ST_YMin(ab.geom) + random() * (ST_YMax(ab.geom) - ST_YMin(ab.geom))
+), 4326)"""
+
+# Rows g = 1..n spread evenly over the districts
+IN_DISTRICT = """generate_series(1, %({count})s) g
+    JOIN {schema}.administrative_boundaries ab ON ab.boundary_id = 1 + (g %% %(districts)s)"""
+
+TABLES_SQL = """
+CREATE TABLE {schema}.administrative_boundaries AS
+SELECT
+    g AS boundary_id,
+    COALESCE((%(names)s::varchar[])[g], 'District ' || g)::varchar(100) AS boundary_name,
+    'district'::varchar(50) AS boundary_type,
+    ('MW' || lpad(g::text, 3, '0'))::varchar(20) AS boundary_code,
+    (100000 + random() * 1400000)::int AS population,
+    (ST_Area(cell::geography) / 1000000)::numeric(10,2) AS area_sqkm,
+    ST_Multi(cell)::geometry(MultiPolygon, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM (
+    SELECT g, ST_MakeEnvelope(
+        %(xmin)s + ((g - 1) %% %(columns)s) * %(dx)s,
+        %(ymin)s + ((g - 1) / %(columns)s) * %(dy)s,
+        %(xmin)s + ((g - 1) %% %(columns)s + 1) * %(dx)s,
+        %(ymin)s + ((g - 1) / %(columns)s + 1) * %(dy)s,
+        4326
+    ) AS cell
+    FROM generate_series(1, %(districts)s) g
+) cells;
+
+CREATE TABLE {schema}.disaster_events AS
+SELECT
+    g AS event_id,
+    (ARRAY['flood', 'flood', 'flood', 'drought', 'storm', 'landslide', 'earthquake'])
+        [1 + floor(random() * 7)::int]::varchar(50) AS event_type,
+    (DATE '1970-01-01' + floor(random() * 20000)::int) AS event_date,
+    (ARRAY['minor', 'moderate', 'moderate', 'severe', 'catastrophic'])
+        [1 + floor(random() * 5)::int]::varchar(20) AS severity,
+    ab.boundary_name::varchar(100) AS affected_area,
+    floor(power(random(), 4) * 200)::int AS casualties,
+    floor(power(random(), 3) * 50000)::int AS displaced_people,
+    (power(random(), 3) * 20000000)::numeric(15,2) AS economic_loss_usd,
+    'Synthetic event ' || g AS description,
+    {point}::geometry(Point, 4326) AS geom,
+    now()::timestamp AS created_date,
+    ab.boundary_id
+FROM (
+    SELECT g, 1 + floor(power(random(), 1.5) * %(districts)s)::int AS boundary_id
+    FROM generate_series(1, %(events)s) g
+) e
+JOIN {schema}.administrative_boundaries ab ON ab.boundary_id = e.boundary_id;
+
+CREATE TABLE {schema}.water_bodies AS
+SELECT
+    g AS water_id,
+    ('River ' || g)::varchar(100) AS water_name,
+    (ARRAY['river', 'river', 'stream', 'lake'])[1 + floor(random() * 4)::int]::varchar(50) AS water_type,
+    (ST_Length(line::geography) / 1000)::numeric(10,2) AS length_km,
+    (5 + random() * 200)::numeric(8,2) AS avg_width_m,
+    random() < 0.4 AS flood_prone,
+    ST_Multi(line)::geometry(MultiLineString, 4326) AS geom,
+    now()::timestamp AS created_date,
+    boundary_id
+FROM (
+    SELECT g, ab.boundary_id, ST_MakeLine({point}, {point}) AS line
+    FROM {water_bodies}
+) w;
+
+CREATE TABLE {schema}.risk_zones AS
+SELECT
+    g AS zone_id,
+    ('Zone ' || g)::varchar(100) AS zone_name,
+    (ARRAY['Low', 'Low', 'Medium', 'Medium', 'High', 'Very High'])
+        [1 + floor(random() * 6)::int]::varchar(20) AS risk_level,
+    (ARRAY['flood', 'flood', 'drought', 'landslide'])[1 + floor(random() * 4)::int]::varchar(50) AS risk_type,
+    floor(random() * 20000)::int AS affected_population,
+    (random() * 10)::numeric(4,2) AS risk_score,
+    (DATE '2015-01-01' + floor(random() * 3000)::int) AS last_assessment_date,
+    ab.boundary_id,
+    ST_Multi(ST_Expand({point}, 0.005 + random() * 0.02))::geometry(MultiPolygon, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM {risk_zones};
+
+CREATE TABLE {schema}.evacuation_centers AS
+SELECT
+    g AS center_id,
+    ('Center ' || g)::varchar(100) AS center_name,
+    capacity,
+    floor(random() * capacity * 0.3)::int AS current_occupancy,
+    'Water, Sanitation'::text AS facilities,
+    random()::numeric(3,2) AS accessibility_score,
+    ab.boundary_id,
+    {point}::geometry(Point, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM (
+    SELECT g, 100 + floor(random() * 4900)::int AS capacity
+    FROM generate_series(1, %(centers)s) g
+) c
+JOIN {schema}.administrative_boundaries ab ON ab.boundary_id = 1 + (g %% %(districts)s);
+
+CREATE TABLE {schema}.infrastructure AS
+SELECT
+    g AS infra_id,
+    ('Facility ' || g)::varchar(100) AS infra_name,
+    (ARRAY['school', 'hospital', 'bridge', 'market', 'health_center'])
+        [1 + floor(random() * 5)::int]::varchar(50) AS infra_type,
+    floor(random() * 2000)::int AS capacity,
+    (CASE WHEN random() < 0.9 THEN 'operational' ELSE 'damaged' END)::varchar(20) AS operational_status,
+    random()::numeric(3,2) AS vulnerability_score,
+    ab.boundary_id,
+    {point}::geometry(Point, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM {infrastructure};
+
+CREATE TABLE {schema}.population_data AS
+SELECT
+    row_number() OVER ()::int AS pop_id,
+    census_year,
+    total_population,
+    (total_population * 0.49)::int AS male_population,
+    (total_population * 0.51)::int AS female_population,
+    (total_population / 4.4)::int AS households,
+    (total_population * 0.2)::int AS vulnerable_population,
+    boundary_id,
+    now()::timestamp AS created_date
+FROM (
+    SELECT
+        ab.boundary_id,
+        census_year,
+        (ab.population * power(1.03, census_year - 2018))::int AS total_population
+    FROM {schema}.administrative_boundaries ab
+    CROSS JOIN unnest(ARRAY[1987, 1998, 2008, 2018]) census_year
+) p;
+
+CREATE TABLE {schema}.rainfall_data AS
+SELECT
+    g AS rainfall_id,
+    ('Station ' || (1 + g %% (%(districts)s * 10)))::varchar(100) AS station_name,
+    (DATE '2010-01-01' + floor(random() * 5000)::int) AS measurement_date,
+    (power(random(), 3) * 250)::numeric(6,2) AS rainfall_mm,
+    ab.boundary_id,
+    {point}::geometry(Point, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM {rainfall};
+
+CREATE TABLE {schema}.soil_data AS
+SELECT
+    g AS soil_id,
+    (ARRAY['clay', 'loam', 'sand', 'silt'])[1 + floor(random() * 4)::int]::varchar(50) AS soil_type,
+    (ARRAY['Poor', 'Moderate', 'Good'])[1 + floor(random() * 3)::int]::varchar(20) AS drainage_capacity,
+    (random() * 100)::numeric(5,2) AS permeability,
+    ab.boundary_id,
+    ST_Multi(ST_Expand({point}, 0.02 + random() * 0.05))::geometry(MultiPolygon, 4326) AS geom,
+    now()::timestamp AS created_date
+FROM {soil_zones};
+
+-- Road grid split at every crossing, so segments meet at shared nodes
+CREATE TABLE {schema}.roads AS
+SELECT
+    row_number() OVER ()::int AS road_id,
+    (ARRAY[5, 30, 60])[1 + floor(random() * 3)::int] AS speed_kmh,
+    ST_SetSRID(ST_MakeLine(ST_MakePoint(x0, y0), ST_MakePoint(x1, y1)), 4326)::geometry(LineString, 4326) AS geom
+FROM (
+    SELECT %(xmin)s + i * %(spacing)s AS x0, %(ymin)s + j * %(spacing)s AS y0,
+           %(xmin)s + (i + 1) * %(spacing)s AS x1, %(ymin)s + j * %(spacing)s AS y1
+    FROM generate_series(0, %(road_columns)s - 1) i, generate_series(0, %(road_rows)s) j
+    UNION ALL
+    SELECT %(xmin)s + i * %(spacing)s, %(ymin)s + j * %(spacing)s,
+           %(xmin)s + i * %(spacing)s, %(ymin)s + (j + 1) * %(spacing)s
+    FROM generate_series(0, %(road_columns)s) i, generate_series(0, %(road_rows)s - 1) j
+) segments;
+
+CREATE TABLE {schema}.evacuation_routes (
+    route_id serial PRIMARY KEY,
+    from_area_id integer NOT NULL,
+    to_center_id integer NOT NULL,
+    distance_km numeric(10,2),
+    estimated_time_minutes numeric(10,2),
+    geom geometry(LineString, 4326),
+    created_date timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+INDEXES_SQL = """
+ALTER TABLE {schema}.administrative_boundaries ADD PRIMARY KEY (boundary_id);
+ALTER TABLE {schema}.disaster_events ADD PRIMARY KEY (event_id);
+ALTER TABLE {schema}.water_bodies ADD PRIMARY KEY (water_id);
+ALTER TABLE {schema}.risk_zones ADD PRIMARY KEY (zone_id);
+ALTER TABLE {schema}.evacuation_centers ADD PRIMARY KEY (center_id);
+ALTER TABLE {schema}.infrastructure ADD PRIMARY KEY (infra_id);
+ALTER TABLE {schema}.population_data ADD PRIMARY KEY (pop_id);
+ALTER TABLE {schema}.rainfall_data ADD PRIMARY KEY (rainfall_id);
+ALTER TABLE {schema}.soil_data ADD PRIMARY KEY (soil_id);
+ALTER TABLE {schema}.roads ADD PRIMARY KEY (road_id);
+
+CREATE INDEX ON {schema}.administrative_boundaries USING gist (geom);
+CREATE INDEX ON {schema}.administrative_boundaries (boundary_name);
+
+CREATE INDEX ON {schema}.disaster_events USING gist (geom);
+CREATE INDEX ON {schema}.disaster_events (boundary_id);
+CREATE INDEX ON {schema}.disaster_events (event_type, boundary_id);
+CREATE INDEX ON {schema}.disaster_events (event_type, event_date);
+CREATE INDEX ON {schema}.disaster_events (event_date);
+
+CREATE INDEX ON {schema}.water_bodies USING gist (geom);
+CREATE INDEX ON {schema}.water_bodies (boundary_id);
+
+CREATE INDEX ON {schema}.risk_zones USING gist (geom);
+CREATE INDEX ON {schema}.risk_zones (boundary_id);
+CREATE INDEX ON {schema}.risk_zones (risk_level);
+
+CREATE INDEX ON {schema}.evacuation_centers USING gist (geom);
+CREATE INDEX ON {schema}.evacuation_centers (boundary_id);
+
+CREATE INDEX ON {schema}.infrastructure USING gist (geom);
+CREATE INDEX ON {schema}.infrastructure (boundary_id);
+
+CREATE INDEX ON {schema}.population_data (boundary_id, census_year DESC);
+
+CREATE INDEX ON {schema}.rainfall_data USING gist (geom);
+CREATE INDEX ON {schema}.rainfall_data (boundary_id);
+CREATE INDEX ON {schema}.rainfall_data (measurement_date, boundary_id);
+
+CREATE INDEX ON {schema}.soil_data USING gist (geom);
+CREATE INDEX ON {schema}.soil_data (boundary_id);
+
+CREATE INDEX ON {schema}.roads USING gist (geom);
+
+CREATE UNIQUE INDEX ON {schema}.evacuation_routes (from_area_id, to_center_id);
+CREATE INDEX ON {schema}.evacuation_routes USING gist (geom);
+"""
+
+TABLES = [
+    'administrative_boundaries', 'disaster_events', 'water_bodies', 'risk_zones',
+    'evacuation_centers', 'infrastructure', 'population_data', 'rainfall_data',
+    'soil_data', 'roads', 'evacuation_routes'
+]
+
+
+def scale_for(name, **overrides):
+    """Get a scale preset with some counts overridden (None values are ignored)"""
+    scale = dict(SCALES[name])
+    scale.update({key: value for key, value in overrides.items() if value is not None})
+    return scale
+
+
+def create_synthetic_data(db, scale, schema=SCHEMA, seed=0.42):
+    """
+    Create the scratch schema and fill it at the given scale
+    The same seed gives the same data, so runs on different code compare.
+    Returns: dict of table -> row count
+    """
+    xmin, ymin, xmax, ymax = MALAWI_BBOX
+    districts = scale['districts']
+    columns = max(1, round(math.sqrt(districts * (xmax - xmin) / (ymax - ymin))))
+    rows = math.ceil(districts / columns)
+    spacing = scale['road_spacing']
+
+    params = {
+        'names': DISTRICT_NAMES,
+        'xmin': xmin,
+        'ymin': ymin,
+        'dx': (xmax - xmin) / columns,
+        'dy': (ymax - ymin) / rows,
+        'columns': columns,
+        'spacing': spacing,
+        'road_columns': math.ceil((xmax - xmin) / spacing),
+        'road_rows': math.ceil((ymax - ymin) / spacing)
+    }
+    params.update(scale)
+
+    sql = TABLES_SQL.format(
+        schema=schema,
+        point=RANDOM_POINT,
+        **{
+            name: IN_DISTRICT.format(schema=schema, count=name)
+            for name in ('water_bodies', 'risk_zones', 'infrastructure', 'rainfall', 'soil_zones')
+        }
+    )
+
+    db.execute_query("CREATE EXTENSION IF NOT EXISTS postgis", fetch=False)
+    db.execute_query(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}", fetch=False)
+    # setseed() only holds for the session, so it is sent with the inserts
+    db.execute_query("SELECT setseed(%(seed)s);" + sql, dict(params, seed=seed), fetch=False)
+    db.execute_query(INDEXES_SQL.format(schema=schema), fetch=False)
+    db.execute_query("; ".join(f"ANALYZE {schema}.{table}" for table in TABLES), fetch=False)
+
+    return row_counts(db, schema)
+
+
+def row_counts(db, schema=SCHEMA):
+    """Get the row count of every synthetic table, or None if the schema does not exist"""
+    exists = db.execute_query("SELECT to_regnamespace(%s) IS NOT NULL AS found", (schema,))
+    if not exists[0]['found']:
+        return None
+    return {
+        table: db.execute_query(f"SELECT COUNT(*) AS n FROM {schema}.{table}")[0]['n']
+        for table in TABLES
+    }
+
+
+def drop_synthetic_data(db, schema=SCHEMA):
+    db.execute_query("SET search_path TO public", fetch=False)
+    db.execute_query(f"DROP SCHEMA IF EXISTS {schema} CASCADE", fetch=False)
+
+
+def write_elevation_raster(filename, pixel_size=500, seed=42):
+    """
+    Write a synthetic DEM GeoTIFF over Malawi in DEM_CRS
+    Elevation rises from about 40 m in the south to 2000 m in the north,
+    with hills and noise on top. Written in row blocks to bound memory.
+    Returns: filename
+    """
+    import numpy as np
+    from osgeo import gdal, osr
+
+    source = osr.SpatialReference()
+    source.ImportFromEPSG(4326)
+    source.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    target = osr.SpatialReference()
+    target.ImportFromEPSG(int(DEM_CRS.split(':')[1]))
+    transform = osr.CoordinateTransformation(source, target)
+
+    xmin, ymin, xmax, ymax = MALAWI_BBOX
+    corners = [transform.TransformPoint(x, y)[:2] for x in (xmin, xmax) for y in (ymin, ymax)]
+    left = min(x for x, _ in corners)
+    right = max(x for x, _ in corners)
+    bottom = min(y for _, y in corners)
+    top = max(y for _, y in corners)
+
+    width = int((right - left) / pixel_size) + 1
+    height = int((top - bottom) / pixel_size) + 1
+
+    dem = gdal.GetDriverByName('GTiff').Create(
+        filename, width, height, 1, gdal.GDT_Float32, options=['COMPRESS=DEFLATE', 'TILED=YES']
+    )
+    dem.SetGeoTransform((left, pixel_size, 0, top, 0, -pixel_size))
+    dem.SetProjection(target.ExportToWkt())
+    band = dem.GetRasterBand(1)
+    band.SetNoDataValue(-9999)
+
+    rng = np.random.default_rng(seed)
+    x = left + (np.arange(width) + 0.5) * pixel_size
+    block_rows = 512
+    for row_start in range(0, height, block_rows):
+        rows = min(block_rows, height - row_start)
+        y = top - (row_start + np.arange(rows) + 0.5) * pixel_size
+        xx, yy = np.meshgrid(x, y)
+        north = (yy - bottom) / (top - bottom)
+        elevation = (
+            40 + 1960 * north
+            + 300 * np.sin(xx / 15000) * np.cos(yy / 22000)
+            + rng.normal(0, 15, xx.shape)
+        )
+        band.WriteArray(np.maximum(elevation, 0).astype(np.float32), 0, row_start)
+
+    band.FlushCache()
+    dem = None
+    return filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--database', default='disaster_risk_db')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--schema', default=SCHEMA)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in SCALES['small']:
+        parser.add_argument('--' + name.replace('_', '-'), type=type(SCALES['small'][name]),
+                            help=f"Override the preset's {name}")
+    parser.add_argument('--dem', help="Also write a synthetic DEM GeoTIFF to this file")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch schema afterwards")
+    args = parser.parse_args()
+
+    scale = scale_for(args.scale, **{name: getattr(args, name) for name in SCALES['small']})
+
+    db = DatabaseManager()
+    success, message = db.connect(args.host, args.port, args.database, args.user, args.password)
+    if not success:
+        sys.exit(message)
+
+    try:
+        start = time.perf_counter()
+        counts = create_synthetic_data(db, scale, args.schema)
+        print(f"Generated {args.schema} in {time.perf_counter() - start:.1f}s")
+        for table, count in counts.items():
+            print(f"  {table:<28} {count:>12,}")
+
+        if args.dem:
+            write_elevation_raster(args.dem)
+            print(f"Wrote {args.dem}")
+    finally:
+        if not args.keep:
+            drop_synthetic_data(db, args.schema)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+--
+-- Migration 001: materialized flood-prone district summary
+--
+-- DatabaseManager.get_flood_prone_districts reads this summary instead of
+-- re-running the district/event/water body join on every analysis. Statement
+-- triggers on the source tables mark it stale, and the next read refreshes it
+-- CONCURRENTLY (which needs the unique index below).
+--
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_flood_prone_districts AS
+SELECT 
+    ab.boundary_id,
+    ab.boundary_name as district,
+    ab.population,
+    ab.area_sqkm,
+    COUNT(DISTINCT de.event_id) as total_flood_events,
+    SUM(de.casualties) as total_casualties,
+    SUM(de.displaced_people) as total_people_displaced,
+    ROUND(SUM(de.economic_loss_usd)/1000000, 2) as economic_loss_millions_usd,
+    STRING_AGG(DISTINCT wb.water_name, ', ') as flood_prone_rivers,
+    COUNT(DISTINCT wb.water_id) as num_flood_prone_waters,
+    CASE 
+        WHEN COUNT(DISTINCT de.event_id) >= 3 THEN 'EXTREME RISK'
+        WHEN COUNT(DISTINCT de.event_id) = 2 THEN 'HIGH RISK'
+        WHEN COUNT(DISTINCT de.event_id) = 1 THEN 'MEDIUM RISK'
+        WHEN COUNT(DISTINCT wb.water_id) > 0 THEN 'LOW RISK'
+        ELSE 'MINIMAL RISK'
+    END as flood_risk_level
+FROM public.administrative_boundaries ab
+LEFT JOIN public.disaster_events de 
+    ON ab.boundary_name = de.affected_area 
+    AND de.event_type = 'flood'
+LEFT JOIN public.water_bodies wb 
+    ON ab.boundary_id = wb.boundary_id 
+    AND wb.flood_prone = TRUE
+GROUP BY ab.boundary_id, ab.boundary_name, ab.population, ab.area_sqkm
+HAVING COUNT(DISTINCT de.event_id) > 0 OR COUNT(DISTINCT wb.water_id) > 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_flood_prone_districts_boundary
+    ON public.mv_flood_prone_districts USING btree (boundary_id);
+
+
+CREATE TABLE IF NOT EXISTS public.summary_refresh_state (
+    summary_name character varying(100) PRIMARY KEY,
+    stale boolean NOT NULL DEFAULT false,
+    changed_at timestamp without time zone,
+    refreshed_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO public.summary_refresh_state (summary_name)
+VALUES ('mv_flood_prone_districts')
+ON CONFLICT (summary_name) DO NOTHING;
+
+
+CREATE OR REPLACE FUNCTION public.mark_flood_summary_stale() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    UPDATE public.summary_refresh_state
+    SET stale = TRUE, changed_at = CURRENT_TIMESTAMP
+    WHERE summary_name = 'mv_flood_prone_districts' AND NOT stale;
+
+    PERFORM pg_notify('summary_stale', 'mv_flood_prone_districts');
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_disaster_events_flood_summary
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.disaster_events
+    FOR EACH STATEMENT EXECUTE FUNCTION public.mark_flood_summary_stale();
+
+CREATE OR REPLACE TRIGGER trg_water_bodies_flood_summary
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.water_bodies
+    FOR EACH STATEMENT EXECUTE FUNCTION public.mark_flood_summary_stale();
+
+CREATE OR REPLACE TRIGGER trg_administrative_boundaries_flood_summary
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.administrative_boundaries
+    FOR EACH STATEMENT EXECUTE FUNCTION public.mark_flood_summary_stale();
@@ -0,0 +1,124 @@
+--
+-- Migration 002: pre-aggregated district summaries
+--
+-- v_district_summary, v_flood_prone_districts and mv_flood_prone_districts
+-- joined water_bodies and disaster_events to administrative_boundaries at the
+-- same level, so every event row was repeated once per water body and
+-- SUM(casualties) etc. were multiplied by the number of water bodies.
+-- Events and water bodies are now aggregated separately and then joined.
+--
+
+DROP VIEW IF EXISTS public.v_district_summary;
+
+CREATE VIEW public.v_district_summary AS
+ WITH district_events AS (
+         SELECT de.affected_area,
+            count(*) AS num_disasters,
+            sum(de.casualties) AS total_casualties,
+            sum(de.displaced_people) AS total_displaced,
+            sum(de.economic_loss_usd) AS total_economic_loss
+           FROM public.disaster_events de
+          GROUP BY de.affected_area
+        ), district_waters AS (
+         SELECT wb.boundary_id,
+            count(*) AS num_water_bodies
+           FROM public.water_bodies wb
+          GROUP BY wb.boundary_id
+        )
+ SELECT ab.boundary_name AS district,
+    ab.boundary_code,
+    ab.population,
+    ab.area_sqkm,
+    COALESCE(dw.num_water_bodies, (0)::bigint) AS num_water_bodies,
+    COALESCE(dev.num_disasters, (0)::bigint) AS num_disasters,
+    dev.total_casualties,
+    dev.total_displaced,
+    round(dev.total_economic_loss, 2) AS total_economic_loss
+   FROM ((public.administrative_boundaries ab
+     LEFT JOIN district_events dev ON (((ab.boundary_name)::text = (dev.affected_area)::text)))
+     LEFT JOIN district_waters dw ON ((ab.boundary_id = dw.boundary_id)))
+  ORDER BY ab.boundary_name;
+
+
+DROP VIEW IF EXISTS public.v_flood_prone_districts;
+
+CREATE VIEW public.v_flood_prone_districts AS
+ WITH flood_events AS (
+         SELECT de.affected_area,
+            count(*) AS flood_count,
+            sum(de.displaced_people) AS total_displaced
+           FROM public.disaster_events de
+          WHERE ((de.event_type)::text = 'flood'::text)
+          GROUP BY de.affected_area
+        ), flood_waters AS (
+         SELECT wb.boundary_id,
+            string_agg(DISTINCT (wb.water_name)::text, ', '::text) AS flood_prone_rivers
+           FROM public.water_bodies wb
+          WHERE (wb.flood_prone = true)
+          GROUP BY wb.boundary_id
+        )
+ SELECT ab.boundary_name AS district,
+    ab.population,
+    COALESCE(fe.flood_count, (0)::bigint) AS flood_count,
+    fe.total_displaced,
+    fw.flood_prone_rivers,
+        CASE
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 3) THEN 'EXTREME'::text
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 2) THEN 'HIGH'::text
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 1) THEN 'MEDIUM'::text
+            ELSE 'LOW'::text
+        END AS risk_level
+   FROM ((public.administrative_boundaries ab
+     LEFT JOIN flood_events fe ON (((ab.boundary_name)::text = (fe.affected_area)::text)))
+     LEFT JOIN flood_waters fw ON ((ab.boundary_id = fw.boundary_id)))
+  ORDER BY COALESCE(fe.flood_count, (0)::bigint) DESC;
+
+
+DROP MATERIALIZED VIEW IF EXISTS public.mv_flood_prone_districts;
+
+CREATE MATERIALIZED VIEW public.mv_flood_prone_districts AS
+WITH flood_events AS (
+    SELECT 
+        affected_area,
+        COUNT(*) as total_flood_events,
+        SUM(casualties) as total_casualties,
+        SUM(displaced_people) as total_people_displaced,
+        SUM(economic_loss_usd) as economic_loss_usd
+    FROM public.disaster_events
+    WHERE event_type = 'flood'
+    GROUP BY affected_area
+),
+flood_waters AS (
+    SELECT 
+        boundary_id,
+        COUNT(*) as num_flood_prone_waters,
+        STRING_AGG(DISTINCT water_name, ', ') as flood_prone_rivers
+    FROM public.water_bodies
+    WHERE flood_prone = TRUE
+    GROUP BY boundary_id
+)
+SELECT 
+    ab.boundary_id,
+    ab.boundary_name as district,
+    ab.population,
+    ab.area_sqkm,
+    COALESCE(fe.total_flood_events, 0) as total_flood_events,
+    fe.total_casualties,
+    fe.total_people_displaced,
+    ROUND(fe.economic_loss_usd/1000000, 2) as economic_loss_millions_usd,
+    fw.flood_prone_rivers,
+    COALESCE(fw.num_flood_prone_waters, 0) as num_flood_prone_waters,
+    CASE 
+        WHEN COALESCE(fe.total_flood_events, 0) >= 3 THEN 'EXTREME RISK'
+        WHEN COALESCE(fe.total_flood_events, 0) = 2 THEN 'HIGH RISK'
+        WHEN COALESCE(fe.total_flood_events, 0) = 1 THEN 'MEDIUM RISK'
+        WHEN COALESCE(fw.num_flood_prone_waters, 0) > 0 THEN 'LOW RISK'
+        ELSE 'MINIMAL RISK'
+    END as flood_risk_level
+FROM public.administrative_boundaries ab
+LEFT JOIN flood_events fe ON fe.affected_area = ab.boundary_name
+LEFT JOIN flood_waters fw ON fw.boundary_id = ab.boundary_id
+WHERE fe.total_flood_events > 0 OR fw.num_flood_prone_waters > 0;
+
+CREATE UNIQUE INDEX idx_mv_flood_prone_districts_boundary
+    ON public.mv_flood_prone_districts USING btree (boundary_id);
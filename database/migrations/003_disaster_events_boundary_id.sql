@@ -0,0 +1,191 @@
+--
+-- Migration 003: disaster_events.boundary_id
+--
+-- Events were related to districts only through the unindexed text match
+-- affected_area = boundary_name. Events now carry the district key like every
+-- other table: backfilled from the event point (ST_Within the district
+-- polygon, using idx_admin_geom) and from the district name where the event
+-- has no geometry. A BEFORE trigger fills it for new rows, and the summary
+-- views are rebuilt to join on the integer key.
+--
+
+ALTER TABLE public.disaster_events
+    ADD COLUMN IF NOT EXISTS boundary_id integer;
+
+UPDATE public.disaster_events de
+SET boundary_id = ab.boundary_id
+FROM public.administrative_boundaries ab
+WHERE de.boundary_id IS NULL
+  AND de.geom IS NOT NULL
+  AND ST_Within(de.geom, ab.geom);
+
+UPDATE public.disaster_events de
+SET boundary_id = ab.boundary_id
+FROM public.administrative_boundaries ab
+WHERE de.boundary_id IS NULL
+  AND de.affected_area = ab.boundary_name;
+
+ALTER TABLE public.disaster_events
+    DROP CONSTRAINT IF EXISTS disaster_events_boundary_id_fkey;
+
+ALTER TABLE ONLY public.disaster_events
+    ADD CONSTRAINT disaster_events_boundary_id_fkey FOREIGN KEY (boundary_id) REFERENCES public.administrative_boundaries(boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_disaster_boundary
+    ON public.disaster_events USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_disaster_type_boundary
+    ON public.disaster_events USING btree (event_type, boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_admin_name
+    ON public.administrative_boundaries USING btree (boundary_name);
+
+
+CREATE OR REPLACE FUNCTION public.set_disaster_event_boundary() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    IF NEW.boundary_id IS NOT NULL AND (
+        TG_OP = 'INSERT' OR NEW.boundary_id IS DISTINCT FROM OLD.boundary_id
+    ) THEN
+        RETURN NEW;
+    END IF;
+
+    NEW.boundary_id := NULL;
+
+    IF NEW.geom IS NOT NULL THEN
+        SELECT ab.boundary_id INTO NEW.boundary_id
+        FROM public.administrative_boundaries ab
+        WHERE ST_Within(NEW.geom, ab.geom)
+        LIMIT 1;
+    END IF;
+
+    IF NEW.boundary_id IS NULL AND NEW.affected_area IS NOT NULL THEN
+        SELECT ab.boundary_id INTO NEW.boundary_id
+        FROM public.administrative_boundaries ab
+        WHERE ab.boundary_name = NEW.affected_area;
+    END IF;
+
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_disaster_events_boundary
+    BEFORE INSERT OR UPDATE OF geom, affected_area, boundary_id ON public.disaster_events
+    FOR EACH ROW EXECUTE FUNCTION public.set_disaster_event_boundary();
+
+
+DROP VIEW IF EXISTS public.v_district_summary;
+
+CREATE VIEW public.v_district_summary AS
+ WITH district_events AS (
+         SELECT de.boundary_id,
+            count(*) AS num_disasters,
+            sum(de.casualties) AS total_casualties,
+            sum(de.displaced_people) AS total_displaced,
+            sum(de.economic_loss_usd) AS total_economic_loss
+           FROM public.disaster_events de
+          GROUP BY de.boundary_id
+        ), district_waters AS (
+         SELECT wb.boundary_id,
+            count(*) AS num_water_bodies
+           FROM public.water_bodies wb
+          GROUP BY wb.boundary_id
+        )
+ SELECT ab.boundary_name AS district,
+    ab.boundary_code,
+    ab.population,
+    ab.area_sqkm,
+    COALESCE(dw.num_water_bodies, (0)::bigint) AS num_water_bodies,
+    COALESCE(dev.num_disasters, (0)::bigint) AS num_disasters,
+    dev.total_casualties,
+    dev.total_displaced,
+    round(dev.total_economic_loss, 2) AS total_economic_loss
+   FROM ((public.administrative_boundaries ab
+     LEFT JOIN district_events dev ON ((ab.boundary_id = dev.boundary_id)))
+     LEFT JOIN district_waters dw ON ((ab.boundary_id = dw.boundary_id)))
+  ORDER BY ab.boundary_name;
+
+
+DROP VIEW IF EXISTS public.v_flood_prone_districts;
+
+CREATE VIEW public.v_flood_prone_districts AS
+ WITH flood_events AS (
+         SELECT de.boundary_id,
+            count(*) AS flood_count,
+            sum(de.displaced_people) AS total_displaced
+           FROM public.disaster_events de
+          WHERE ((de.event_type)::text = 'flood'::text)
+          GROUP BY de.boundary_id
+        ), flood_waters AS (
+         SELECT wb.boundary_id,
+            string_agg(DISTINCT (wb.water_name)::text, ', '::text) AS flood_prone_rivers
+           FROM public.water_bodies wb
+          WHERE (wb.flood_prone = true)
+          GROUP BY wb.boundary_id
+        )
+ SELECT ab.boundary_name AS district,
+    ab.population,
+    COALESCE(fe.flood_count, (0)::bigint) AS flood_count,
+    fe.total_displaced,
+    fw.flood_prone_rivers,
+        CASE
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 3) THEN 'EXTREME'::text
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 2) THEN 'HIGH'::text
+            WHEN (COALESCE(fe.flood_count, (0)::bigint) >= 1) THEN 'MEDIUM'::text
+            ELSE 'LOW'::text
+        END AS risk_level
+   FROM ((public.administrative_boundaries ab
+     LEFT JOIN flood_events fe ON ((ab.boundary_id = fe.boundary_id)))
+     LEFT JOIN flood_waters fw ON ((ab.boundary_id = fw.boundary_id)))
+  ORDER BY COALESCE(fe.flood_count, (0)::bigint) DESC;
+
+
+DROP MATERIALIZED VIEW IF EXISTS public.mv_flood_prone_districts;
+
+CREATE MATERIALIZED VIEW public.mv_flood_prone_districts AS
+WITH flood_events AS (
+    SELECT
+        boundary_id,
+        COUNT(*) as total_flood_events,
+        SUM(casualties) as total_casualties,
+        SUM(displaced_people) as total_people_displaced,
+        SUM(economic_loss_usd) as economic_loss_usd
+    FROM public.disaster_events
+    WHERE event_type = 'flood'
+    GROUP BY boundary_id
+),
+flood_waters AS (
+    SELECT
+        boundary_id,
+        COUNT(*) as num_flood_prone_waters,
+        STRING_AGG(DISTINCT water_name, ', ') as flood_prone_rivers
+    FROM public.water_bodies
+    WHERE flood_prone = TRUE
+    GROUP BY boundary_id
+)
+SELECT
+    ab.boundary_id,
+    ab.boundary_name as district,
+    ab.population,
+    ab.area_sqkm,
+    COALESCE(fe.total_flood_events, 0) as total_flood_events,
+    fe.total_casualties,
+    fe.total_people_displaced,
+    ROUND(fe.economic_loss_usd/1000000, 2) as economic_loss_millions_usd,
+    fw.flood_prone_rivers,
+    COALESCE(fw.num_flood_prone_waters, 0) as num_flood_prone_waters,
+    CASE
+        WHEN COALESCE(fe.total_flood_events, 0) >= 3 THEN 'EXTREME RISK'
+        WHEN COALESCE(fe.total_flood_events, 0) = 2 THEN 'HIGH RISK'
+        WHEN COALESCE(fe.total_flood_events, 0) = 1 THEN 'MEDIUM RISK'
+        WHEN COALESCE(fw.num_flood_prone_waters, 0) > 0 THEN 'LOW RISK'
+        ELSE 'MINIMAL RISK'
+    END as flood_risk_level
+FROM public.administrative_boundaries ab
+LEFT JOIN flood_events fe ON fe.boundary_id = ab.boundary_id
+LEFT JOIN flood_waters fw ON fw.boundary_id = ab.boundary_id
+WHERE fe.total_flood_events > 0 OR fw.num_flood_prone_waters > 0;
+
+CREATE UNIQUE INDEX idx_mv_flood_prone_districts_boundary
+    ON public.mv_flood_prone_districts USING btree (boundary_id);
@@ -0,0 +1,58 @@
+--
+-- Migration 004: foreign-key and composite indexes
+--
+-- Only the geometry columns were indexed, so every get_*_in_district call
+-- scanned the whole table for its boundary_id. schema_migrations.py checks
+-- with EXPLAIN that the DatabaseManager queries use these indexes.
+--
+
+CREATE INDEX IF NOT EXISTS idx_infra_boundary
+    ON public.infrastructure USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_evacuation_boundary
+    ON public.evacuation_centers USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_water_boundary
+    ON public.water_bodies USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_risk_boundary
+    ON public.risk_zones USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_rainfall_boundary
+    ON public.rainfall_data USING btree (boundary_id);
+
+CREATE INDEX IF NOT EXISTS idx_soil_boundary
+    ON public.soil_data USING btree (boundary_id);
+
+-- population_data is always read per district, newest census first
+CREATE INDEX IF NOT EXISTS idx_population_boundary_year
+    ON public.population_data USING btree (boundary_id, census_year DESC);
+
+-- Rainfall is read by date range, then per district
+CREATE INDEX IF NOT EXISTS idx_rainfall_date_boundary
+    ON public.rainfall_data USING btree (measurement_date, boundary_id);
+
+-- Event history by type over time (replaces the single-column idx_disaster_type)
+CREATE INDEX IF NOT EXISTS idx_disaster_type_date
+    ON public.disaster_events USING btree (event_type, event_date);
+
+DROP INDEX IF EXISTS public.idx_disaster_type;
+
+
+-- Routes written by EvacuationPlanner.save_evacuation_routes_to_db; the
+-- unique index is the conflict target for upsert=True.
+CREATE TABLE IF NOT EXISTS public.evacuation_routes (
+    route_id serial PRIMARY KEY,
+    from_area_id integer NOT NULL,
+    to_center_id integer NOT NULL REFERENCES public.evacuation_centers(center_id),
+    distance_km numeric(10,2),
+    estimated_time_minutes numeric(10,2),
+    geom public.geometry(LineString,4326),
+    created_date timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_evacuation_routes_area_center
+    ON public.evacuation_routes USING btree (from_area_id, to_center_id);
+
+CREATE INDEX IF NOT EXISTS idx_evacuation_routes_geom
+    ON public.evacuation_routes USING gist (geom);
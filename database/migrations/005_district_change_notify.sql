@@ -0,0 +1,19 @@
+--
+-- Migration 005: district change notifications
+--
+-- The plugin keeps an in-memory DistrictCatalog and LISTENs on
+-- districts_changed to reload it when administrative_boundaries is modified.
+--
+
+CREATE OR REPLACE FUNCTION public.notify_districts_changed() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    PERFORM pg_notify('districts_changed', TG_OP);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER trg_administrative_boundaries_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.administrative_boundaries
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_districts_changed();
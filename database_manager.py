@@ -1,290 +1,1097 @@
-# -*- coding: utf-8 -*-
-"""
-Database Manager - Handles PostgreSQL/PostGIS connections and operations
-"""
-
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from qgis.core import QgsVectorLayer, QgsDataSourceUri
-
-class DatabaseManager:
-    def __init__(self):
-        self.conn = None
-        self.connection_params = {}
-
-    def connect(self, host, port, database, user, password):
-        """Establish database connection"""
-        try:
-            self.connection_params = {
-                'host': host,
-                'port': port,
-                'database': database,
-                'user': user,
-                'password': password
-            }
-            
-            self.conn = psycopg2.connect(
-                host=host,
-                port=port,
-                database=database,
-                user=user,
-                password=password
-            )
-            return True, "Connected successfully"
-        except Exception as e:
-            return False, f"Connection failed: {str(e)}"
-
-    def execute_query(self, query, params=None, fetch=True):
-        """Execute SQL query"""
-        try:
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(query, params)
-            
-            if fetch:
-                return cursor.fetchall()
-            else:
-                self.conn.commit()
-                return True
-        except Exception as e:
-            if self.conn:
-                self.conn.rollback()
-            raise Exception(f"Query error: {str(e)}")
-
-    def load_layer_from_db(self, table_name, geometry_column='geom', layer_name=None, where_clause=None):
-        """Load PostGIS layer into QGIS"""
-        try:
-            uri = QgsDataSourceUri()
-            uri.setConnection(
-                self.connection_params['host'],
-                self.connection_params['port'],
-                self.connection_params['database'],
-                self.connection_params['user'],
-                self.connection_params['password']
-            )
-            
-            uri.setDataSource("public", table_name, geometry_column, where_clause)
-            
-            if layer_name is None:
-                layer_name = table_name.replace('_', ' ').title()
-            
-            layer = QgsVectorLayer(uri.uri(), layer_name, "postgres")
-            
-            if layer.isValid():
-                return layer, "Layer loaded successfully"
-            else:
-                return None, "Invalid layer"
-        except Exception as e:
-            return None, f"Error loading layer: {str(e)}"
-
-    def get_flood_prone_districts(self):
-        """Get districts most prone to flooding"""
-        query = """
-        SELECT 
-            ab.boundary_id,
-            ab.boundary_name as district,
-            ab.population,
-            ab.area_sqkm,
-            COUNT(DISTINCT de.event_id) as total_flood_events,
-            SUM(de.casualties) as total_casualties,
-            SUM(de.displaced_people) as total_people_displaced,
-            ROUND(SUM(de.economic_loss_usd)/1000000, 2) as economic_loss_millions_usd,
-            STRING_AGG(DISTINCT wb.water_name, ', ') as flood_prone_rivers,
-            COUNT(DISTINCT wb.water_id) as num_flood_prone_waters,
-            CASE 
-                WHEN COUNT(DISTINCT de.event_id) >= 3 THEN 'EXTREME RISK'
-                WHEN COUNT(DISTINCT de.event_id) = 2 THEN 'HIGH RISK'
-                WHEN COUNT(DISTINCT de.event_id) = 1 THEN 'MEDIUM RISK'
-                WHEN COUNT(DISTINCT wb.water_id) > 0 THEN 'LOW RISK'
-                ELSE 'MINIMAL RISK'
-            END as flood_risk_level
-        FROM administrative_boundaries ab
-        LEFT JOIN disaster_events de 
-            ON ab.boundary_name = de.affected_area 
-            AND de.event_type = 'flood'
-        LEFT JOIN water_bodies wb 
-            ON ab.boundary_id = wb.boundary_id 
-            AND wb.flood_prone = TRUE
-        GROUP BY ab.boundary_id, ab.boundary_name, ab.population, ab.area_sqkm
-        HAVING COUNT(DISTINCT de.event_id) > 0 OR COUNT(DISTINCT wb.water_id) > 0
-        ORDER BY 
-            COUNT(DISTINCT de.event_id) DESC,
-            SUM(de.displaced_people) DESC;
-        """
-        return self.execute_query(query)
-
-    def get_district_by_river(self, river_name):
-        """Find which district a river is in"""
-        query = """
-        SELECT 
-            wb.water_name,
-            ab.boundary_name as district_name,
-            wb.water_type,
-            wb.flood_prone,
-            wb.length_km
-        FROM water_bodies wb
-        JOIN administrative_boundaries ab ON wb.boundary_id = ab.boundary_id
-        WHERE wb.water_name ILIKE %s;
-        """
-        return self.execute_query(query, (f'%{river_name}%',))
-
-    def get_historical_events_in_district(self, district_name):
-        """Get historical disaster events in a district"""
-        query = """
-        SELECT 
-            event_id,
-            event_type, 
-            event_date, 
-            severity, 
-            affected_area,
-            casualties,
-            displaced_people,
-            economic_loss_usd,
-            description
-        FROM disaster_events
-        WHERE affected_area = %s
-        ORDER BY event_date DESC;
-        """
-        return self.execute_query(query, (district_name,))
-
-    def get_all_districts(self):
-        """Get all administrative boundaries (districts)"""
-        query = """
-        SELECT 
-            boundary_id,
-            boundary_name,
-            boundary_type,
-            boundary_code,
-            population,
-            area_sqkm
-        FROM administrative_boundaries
-        ORDER BY boundary_name;
-        """
-        return self.execute_query(query)
-
-    def get_infrastructure_in_district(self, district_id):
-        """Get all infrastructure in a district"""
-        query = """
-        SELECT 
-            infra_id,
-            infra_name,
-            infra_type,
-            capacity,
-            operational_status,
-            vulnerability_score
-        FROM infrastructure
-        WHERE boundary_id = %s
-        ORDER BY infra_type, infra_name;
-        """
-        return self.execute_query(query, (district_id,))
-
-    def get_evacuation_centers(self, district_id=None):
-        """Get evacuation centers, optionally filtered by district"""
-        if district_id:
-            query = """
-            SELECT 
-                center_id,
-                center_name,
-                capacity,
-                current_occupancy,
-                facilities,
-                accessibility_score,
-                ab.boundary_name as district
-            FROM evacuation_centers ec
-            JOIN administrative_boundaries ab ON ec.boundary_id = ab.boundary_id
-            WHERE ec.boundary_id = %s
-            ORDER BY capacity DESC;
-            """
-            return self.execute_query(query, (district_id,))
-        else:
-            query = """
-            SELECT 
-                center_id,
-                center_name,
-                capacity,
-                current_occupancy,
-                facilities,
-                accessibility_score,
-                ab.boundary_name as district
-            FROM evacuation_centers ec
-            JOIN administrative_boundaries ab ON ec.boundary_id = ab.boundary_id
-            ORDER BY ab.boundary_name, capacity DESC;
-            """
-            return self.execute_query(query)
-
-    def get_risk_zones(self, risk_level=None):
-        """Get risk zones, optionally filtered by risk level"""
-        if risk_level:
-            query = """
-            SELECT 
-                rz.zone_id,
-                rz.zone_name,
-                rz.risk_level,
-                rz.risk_type,
-                rz.affected_population,
-                rz.risk_score,
-                ab.boundary_name as district
-            FROM risk_zones rz
-            JOIN administrative_boundaries ab ON rz.boundary_id = ab.boundary_id
-            WHERE rz.risk_level = %s
-            ORDER BY rz.risk_score DESC;
-            """
-            return self.execute_query(query, (risk_level,))
-        else:
-            query = """
-            SELECT 
-                rz.zone_id,
-                rz.zone_name,
-                rz.risk_level,
-                rz.risk_type,
-                rz.affected_population,
-                rz.risk_score,
-                ab.boundary_name as district
-            FROM risk_zones rz
-            JOIN administrative_boundaries ab ON rz.boundary_id = ab.boundary_id
-            ORDER BY rz.risk_score DESC;
-            """
-            return self.execute_query(query)
-
-    def get_district_summary(self, district_name):
-        """Get complete summary for a specific district"""
-        query = """
-        SELECT 
-            ab.boundary_name as district,
-            ab.boundary_code,
-            ab.population,
-            ab.area_sqkm,
-            COUNT(DISTINCT wb.water_id) as num_water_bodies,
-            COUNT(DISTINCT de.event_id) as num_disasters,
-            SUM(de.casualties) as total_casualties,
-            SUM(de.displaced_people) as total_displaced,
-            ROUND(SUM(de.economic_loss_usd), 2) as total_economic_loss,
-            STRING_AGG(DISTINCT wb.water_name, ', ') as water_bodies_list
-        FROM administrative_boundaries ab
-        LEFT JOIN water_bodies wb ON ab.boundary_id = wb.boundary_id
-        LEFT JOIN disaster_events de ON ab.boundary_name = de.affected_area
-        WHERE ab.boundary_name = %s
-        GROUP BY ab.boundary_id, ab.boundary_name, ab.boundary_code, ab.population, ab.area_sqkm;
-        """
-        result = self.execute_query(query, (district_name,))
-        return result[0] if result else None
-
-    def get_population_data(self, district_id):
-        """Get population data for a district"""
-        query = """
-        SELECT 
-            census_year,
-            total_population,
-            male_population,
-            female_population,
-            households,
-            vulnerable_population
-        FROM population_data
-        WHERE boundary_id = %s
-        ORDER BY census_year DESC;
-        """
-        return self.execute_query(query, (district_id,))
-
-    def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Database Manager - Handles PostgreSQL/PostGIS connections and operations
+"""
+
+import csv
+import hashlib
+import itertools
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# psycopg2 is imported by the first connect(), not when the plugin loads
+psycopg2 = None
+
+
+def _import_psycopg2():
+    """Import psycopg2 and the submodules used here on first use"""
+    global psycopg2
+    if psycopg2 is None:
+        import psycopg2.errors
+        import psycopg2.extensions
+        import psycopg2.extras
+        import psycopg2.pool
+    return psycopg2
+
+
+# Fixed read queries, executed by name through prepared statements.
+# District summaries aggregate events and water bodies separately before
+# joining them to the district, so neither table multiplies the other's rows.
+# Events are matched to districts on the indexed boundary_id key (migration 003).
+QUERIES = {
+    'flood_prone_districts': """
+        WITH flood_events AS (
+            SELECT 
+                boundary_id,
+                COUNT(*) as total_flood_events,
+                SUM(casualties) as total_casualties,
+                SUM(displaced_people) as total_people_displaced,
+                SUM(economic_loss_usd) as economic_loss_usd
+            FROM disaster_events
+            WHERE event_type = 'flood'
+            GROUP BY boundary_id
+        ),
+        flood_waters AS (
+            SELECT 
+                boundary_id,
+                COUNT(*) as num_flood_prone_waters,
+                STRING_AGG(DISTINCT water_name, ', ') as flood_prone_rivers
+            FROM water_bodies
+            WHERE flood_prone = TRUE
+            GROUP BY boundary_id
+        )
+        SELECT 
+            ab.boundary_id,
+            ab.boundary_name as district,
+            ab.population,
+            ab.area_sqkm,
+            COALESCE(fe.total_flood_events, 0) as total_flood_events,
+            fe.total_casualties,
+            fe.total_people_displaced,
+            ROUND(fe.economic_loss_usd/1000000, 2) as economic_loss_millions_usd,
+            fw.flood_prone_rivers,
+            COALESCE(fw.num_flood_prone_waters, 0) as num_flood_prone_waters,
+            CASE 
+                WHEN COALESCE(fe.total_flood_events, 0) >= 3 THEN 'EXTREME RISK'
+                WHEN COALESCE(fe.total_flood_events, 0) = 2 THEN 'HIGH RISK'
+                WHEN COALESCE(fe.total_flood_events, 0) = 1 THEN 'MEDIUM RISK'
+                WHEN COALESCE(fw.num_flood_prone_waters, 0) > 0 THEN 'LOW RISK'
+                ELSE 'MINIMAL RISK'
+            END as flood_risk_level
+        FROM administrative_boundaries ab
+        LEFT JOIN flood_events fe ON fe.boundary_id = ab.boundary_id
+        LEFT JOIN flood_waters fw ON fw.boundary_id = ab.boundary_id
+        WHERE fe.total_flood_events > 0 OR fw.num_flood_prone_waters > 0
+        ORDER BY 
+            total_flood_events DESC,
+            total_people_displaced DESC;
+    """,
+
+    'flood_prone_districts_summary': """
+        SELECT
+            boundary_id,
+            district,
+            population,
+            area_sqkm,
+            total_flood_events,
+            total_casualties,
+            total_people_displaced,
+            economic_loss_millions_usd,
+            flood_prone_rivers,
+            num_flood_prone_waters,
+            flood_risk_level
+        FROM mv_flood_prone_districts
+        ORDER BY 
+            total_flood_events DESC,
+            total_people_displaced DESC;
+    """,
+
+    'district_by_river': """
+        SELECT 
+            wb.water_name,
+            ab.boundary_name as district_name,
+            wb.water_type,
+            wb.flood_prone,
+            wb.length_km
+        FROM water_bodies wb
+        JOIN administrative_boundaries ab ON wb.boundary_id = ab.boundary_id
+        WHERE wb.water_name ILIKE %s;
+    """,
+
+    'historical_events_in_district': """
+        SELECT 
+            de.event_id,
+            de.event_type, 
+            de.event_date, 
+            de.severity, 
+            de.affected_area,
+            de.casualties,
+            de.displaced_people,
+            de.economic_loss_usd,
+            de.description
+        FROM disaster_events de
+        JOIN administrative_boundaries ab ON de.boundary_id = ab.boundary_id
+        WHERE ab.boundary_name = %s
+        ORDER BY de.event_date DESC;
+    """,
+
+    'all_districts': """
+        SELECT 
+            boundary_id,
+            boundary_name,
+            boundary_type,
+            boundary_code,
+            population,
+            area_sqkm
+        FROM administrative_boundaries
+        ORDER BY boundary_name;
+    """,
+
+    'infrastructure_in_district': """
+        SELECT 
+            infra_id,
+            infra_name,
+            infra_type,
+            capacity,
+            operational_status,
+            vulnerability_score
+        FROM infrastructure
+        WHERE boundary_id = %s
+        ORDER BY infra_type, infra_name;
+    """,
+
+    'evacuation_centers_by_district': """
+        SELECT 
+            center_id,
+            center_name,
+            capacity,
+            current_occupancy,
+            facilities,
+            accessibility_score,
+            ab.boundary_name as district
+        FROM evacuation_centers ec
+        JOIN administrative_boundaries ab ON ec.boundary_id = ab.boundary_id
+        WHERE ec.boundary_id = %s
+        ORDER BY capacity DESC;
+    """,
+
+    'evacuation_centers': """
+        SELECT 
+            center_id,
+            center_name,
+            capacity,
+            current_occupancy,
+            facilities,
+            accessibility_score,
+            ab.boundary_name as district
+        FROM evacuation_centers ec
+        JOIN administrative_boundaries ab ON ec.boundary_id = ab.boundary_id
+        ORDER BY ab.boundary_name, capacity DESC;
+    """,
+
+    'risk_zones_by_level': """
+        SELECT 
+            rz.zone_id,
+            rz.zone_name,
+            rz.risk_level,
+            rz.risk_type,
+            rz.affected_population,
+            rz.risk_score,
+            ab.boundary_name as district
+        FROM risk_zones rz
+        JOIN administrative_boundaries ab ON rz.boundary_id = ab.boundary_id
+        WHERE rz.risk_level = %s
+        ORDER BY rz.risk_score DESC;
+    """,
+
+    'risk_zones': """
+        SELECT 
+            rz.zone_id,
+            rz.zone_name,
+            rz.risk_level,
+            rz.risk_type,
+            rz.affected_population,
+            rz.risk_score,
+            ab.boundary_name as district
+        FROM risk_zones rz
+        JOIN administrative_boundaries ab ON rz.boundary_id = ab.boundary_id
+        ORDER BY rz.risk_score DESC;
+    """,
+
+    'district_summary': """
+        SELECT 
+            ab.boundary_name as district,
+            ab.boundary_code,
+            ab.population,
+            ab.area_sqkm,
+            wb.num_water_bodies,
+            de.num_disasters,
+            de.total_casualties,
+            de.total_displaced,
+            ROUND(de.total_economic_loss, 2) as total_economic_loss,
+            wb.water_bodies_list
+        FROM administrative_boundaries ab
+        LEFT JOIN LATERAL (
+            SELECT 
+                COUNT(*) as num_water_bodies,
+                STRING_AGG(DISTINCT water_name, ', ') as water_bodies_list
+            FROM water_bodies
+            WHERE boundary_id = ab.boundary_id
+        ) wb ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT 
+                COUNT(*) as num_disasters,
+                SUM(casualties) as total_casualties,
+                SUM(displaced_people) as total_displaced,
+                SUM(economic_loss_usd) as total_economic_loss
+            FROM disaster_events
+            WHERE boundary_id = ab.boundary_id
+        ) de ON TRUE
+        WHERE ab.boundary_name = %s;
+    """,
+
+    'population_data': """
+        SELECT 
+            census_year,
+            total_population,
+            male_population,
+            female_population,
+            households,
+            vulnerable_population
+        FROM population_data
+        WHERE boundary_id = %s
+        ORDER BY census_year DESC;
+    """,
+
+    'historical_events_in_area': """
+        SELECT 
+            event_id,
+            event_type, 
+            event_date, 
+            severity, 
+            affected_area,
+            casualties,
+            displaced_people,
+            economic_loss_usd
+        FROM disaster_events
+        WHERE ST_DWithin(geom, ST_GeomFromWKB(%s, 4326), %s)
+        ORDER BY event_date DESC;
+    """,
+
+    'historical_events_in_areas': """
+        SELECT 
+            areas.area_index,
+            de.event_id,
+            de.event_type, 
+            de.event_date, 
+            de.severity, 
+            de.affected_area,
+            de.casualties,
+            de.displaced_people,
+            de.economic_loss_usd
+        FROM unnest(%s::bytea[]) WITH ORDINALITY AS areas(wkb, area_index)
+        JOIN disaster_events de 
+            ON ST_DWithin(de.geom, ST_GeomFromWKB(areas.wkb, 4326), %s)
+        ORDER BY areas.area_index, de.event_date DESC;
+    """
+}
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections
+    Checkout blocks while all connections are in use, and a thread that
+    already holds a connection reuses it for nested calls
+    """
+
+    def __init__(self, min_connections, max_connections, health_check=True, **connection_params):
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.health_check = health_check
+
+        _import_psycopg2()
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_connections, max_connections, **connection_params)
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'checkout_time': 0.0,
+            'max_checkout_time': 0.0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'failed_health_checks': 0
+        }
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, waiting for a free slot if needed"""
+        start = time.perf_counter()
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waits'] += 1
+            if not self._slots.acquire(timeout=timeout):
+                raise psycopg2.pool.PoolError("Timed out waiting for a free database connection")
+            with self._lock:
+                self._stats['wait_time'] += time.perf_counter() - start
+
+        try:
+            conn = self._pool.getconn()
+            if self.health_check and not self._is_healthy(conn):
+                with self._lock:
+                    self._stats['failed_health_checks'] += 1
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['checkout_time'] += elapsed
+            self._stats['max_checkout_time'] = max(self._stats['max_checkout_time'], elapsed)
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool"""
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def held(self):
+        """Get the connection the current thread has checked out, or None"""
+        return getattr(self._local, 'conn', None)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.getconn()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self.putconn(conn)
+
+    def _is_healthy(self, conn):
+        """Check that a pooled connection is still usable"""
+        if conn.closed:
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def stats(self):
+        """Get pool statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        checkouts = stats['checkouts']
+        stats['avg_checkout_time'] = stats['checkout_time'] / checkouts if checkouts else 0.0
+        stats['min_connections'] = self.min_connections
+        stats['max_connections'] = self.max_connections
+        stats['available'] = self.max_connections - stats['in_use']
+        return stats
+
+    def closeall(self):
+        """Close every pooled connection"""
+        self._pool.closeall()
+
+
+class PreparedStatementRegistry:
+    """
+    Fixed SQL statements that are PREPAREd once per connection
+    Statements are prepared lazily the first time they run on a connection,
+    so new pooled connections and reconnects re-prepare them automatically
+    """
+
+    def __init__(self, statements):
+        self.statements = dict(statements)
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def execute(self, conn, name, params=None):
+        """Execute a registered statement by name and fetch all rows"""
+        if name not in self.statements:
+            raise KeyError(f"Unknown prepared statement: {name}")
+
+        start = time.perf_counter()
+        was_idle = conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            rows = self._execute(conn, name, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # The server dropped the statement (DEALLOCATE, DISCARD ALL). Retrying
+            # needs a rollback, so only retry when the caller had no open work
+            self.forget(conn)
+            if not was_idle:
+                raise
+            conn.rollback()
+            rows = self._execute(conn, name, params)
+
+        self._record(name, time.perf_counter() - start)
+        return rows
+
+    def forget(self, conn):
+        """Mark every statement as unprepared on a connection"""
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+    def _execute(self, conn, name, params):
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+        if name not in prepared:
+            was_idle = conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            cursor.execute(f"PREPARE {name} AS {self._positional(self.statements[name])}")
+            if was_idle:
+                # End the implicit transaction PREPARE opened; the statement
+                # itself outlives rollbacks either way
+                conn.commit()
+            prepared.add(name)
+
+        if params:
+            placeholders = ', '.join(['%s'] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+        return cursor.fetchall()
+
+    @staticmethod
+    def _positional(query):
+        """Convert %s placeholders to PREPARE-style $1, $2, ..."""
+        counter = itertools.count(1)
+        query = query.strip().rstrip(';')
+        return re.sub(r'%s', lambda match: f"${next(counter)}", query)
+
+    def _record(self, name, elapsed):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'calls': 0, 'total_time': 0.0})
+            stats['calls'] += 1
+            stats['total_time'] += elapsed
+
+    def stats(self):
+        """Get per-statement call counts and cumulative time"""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                result[name] = dict(stats)
+                result[name]['avg_time'] = stats['total_time'] / stats['calls']
+            return result
+
+
+class QueryCache:
+    """
+    TTL + LRU cache of read query results keyed by (query, params)
+    Each entry remembers the tables its query reads, so a write can drop
+    exactly the entries it may have made stale.
+    """
+
+    _TABLE_PATTERN = re.compile(
+        r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE|VIEW)\s+'
+        r'(?:ONLY\s+|CONCURRENTLY\s+|IF\s+(?:NOT\s+)?EXISTS\s+)?(?!(?:SET|LATERAL)\b)([A-Za-z_][\w.]*)',
+        re.IGNORECASE
+    )
+
+    def __init__(self, max_entries=256, default_ttl=300, ttls=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidated': 0}
+
+    def ttl_for(self, name):
+        """Get the TTL in seconds for a query name, 0 means not cached"""
+        return self.ttls.get(name, self.default_ttl)
+
+    def get(self, key):
+        """Get cached rows, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            expires, _, rows = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return [dict(row) for row in rows]
+
+    def put(self, key, rows, ttl, tables):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, tables, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tables=None):
+        """Drop entries reading any of the given tables, or everything if None"""
+        with self._lock:
+            if tables is None:
+                stale = list(self._entries)
+            else:
+                tables = set(tables)
+                stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                del self._entries[key]
+            self._stats['invalidated'] += len(stale)
+            return len(stale)
+
+    @classmethod
+    def tables(cls, query):
+        """Get the lower-case, schema-less table names a statement reads or writes"""
+        return frozenset(
+            name.lower().split('.')[-1] for name in cls._TABLE_PATTERN.findall(query)
+        )
+
+    def stats(self):
+        """Get hit/miss counters and the current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            return stats
+
+
+class DatabaseManager:
+    STREAM_ITERSIZE = 2000
+    EVENT_CACHE_SIZE = 1024
+
+    # Result cache TTLs in seconds for the named QUERIES, used once
+    # enable_cache() is called. Reference data is kept longest; spatial event
+    # lookups have their own cache and are not cached here.
+    CACHE_TTLS = {
+        'all_districts': 3600,
+        'district_by_river': 3600,
+        'population_data': 3600,
+        'evacuation_centers': 600,
+        'evacuation_centers_by_district': 600,
+        'risk_zones': 600,
+        'risk_zones_by_level': 600,
+        'infrastructure_in_district': 600,
+        'historical_events_in_area': 0,
+        'historical_events_in_areas': 0
+    }
+
+    def __init__(self):
+        self.conn = None
+        self.pool = None
+        self.connection_params = {}
+        self._cursor_ids = itertools.count(1)
+        self.statements = PreparedStatementRegistry(QUERIES)
+        self._has_flood_summary = None
+        self._event_cache = OrderedDict()
+        self._event_cache_lock = threading.Lock()
+        # Bumped on every connect so dependent caches can tell they are stale
+        self.generation = 0
+        self.cache = None
+
+    def connect(self, host, port, database, user, password,
+                pooled=False, min_connections=1, max_connections=5):
+        """
+        Establish database connection
+        With pooled=True each query checks out one of min_connections to
+        max_connections pooled connections, so several threads can query at once
+        """
+        try:
+            _import_psycopg2()
+            self.close()
+            self._has_flood_summary = None
+            self.generation += 1
+            if self.cache:
+                self.cache.invalidate()
+
+            self.connection_params = {
+                'host': host,
+                'port': port,
+                'database': database,
+                'user': user,
+                'password': password
+            }
+            
+            if pooled:
+                self.pool = ConnectionPool(min_connections, max_connections, **self.connection_params)
+            else:
+                self.conn = psycopg2.connect(
+                    host=host,
+                    port=port,
+                    database=database,
+                    user=user,
+                    password=password
+                )
+            return True, "Connected successfully"
+        except Exception as e:
+            return False, f"Connection failed: {str(e)}"
+
+    @contextmanager
+    def connection(self):
+        """Check out the connection to use for the current thread"""
+        if self.pool:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            yield self.conn
+
+    def execute_query(self, query, params=None, fetch=True, cache_ttl=None):
+        """
+        Execute SQL query
+        With the cache enabled, reads are served from it for cache_ttl seconds
+        (default TTL if None, 0 to bypass) and writes invalidate the tables
+        they touch
+        """
+        if fetch and self.cache:
+            ttl = self.cache.default_ttl if cache_ttl is None else cache_ttl
+            return self._cached_read(query, params, ttl, lambda: self._execute_query(query, params, fetch))
+
+        result = self._execute_query(query, params, fetch)
+        if not fetch:
+            self.invalidate_cache(QueryCache.tables(query))
+        return result
+
+    def _execute_query(self, query, params, fetch):
+        with self.connection() as conn:
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cursor.execute(query, params)
+                
+                if fetch:
+                    return cursor.fetchall()
+                else:
+                    conn.commit()
+                    return True
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+    def execute_values(self, query, rows, template=None, page_size=1000):
+        """
+        Execute a multi-row statement whose query contains a single VALUES %s
+        Rows are sent page_size at a time inside one transaction with one commit
+        """
+        with self.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                psycopg2.extras.execute_values(cursor, query, rows, template=template, page_size=page_size)
+                conn.commit()
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+        self.invalidate_cache(QueryCache.tables(query))
+        return True
+
+    def stream_query(self, query, params=None, itersize=None):
+        """
+        Execute SQL query through a server-side cursor
+        Rows are yielded lazily, fetching itersize rows per round trip,
+        so the full result set is never held in memory
+        The cursor is closed and a pooled connection returned as soon as the
+        generator is exhausted or closed (break, close(), or garbage
+        collection), so close an abandoned stream rather than leave it to GC.
+        """
+        # Checked out without binding it to the thread: other queries on this
+        # thread must not reuse it while the generator is suspended
+        held = self.pool.held() if self.pool else self.conn
+        conn = held or self.pool.getconn()
+        was_idle = conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        cursor = None
+        try:
+            cursor = conn.cursor(
+                name=f"stream_{next(self._cursor_ids)}",
+                cursor_factory=psycopg2.extras.RealDictCursor
+            )
+            cursor.itersize = itersize or self.STREAM_ITERSIZE
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+        except Exception as e:
+            if not conn.closed:
+                conn.rollback()
+            raise Exception(f"Query error: {str(e)}")
+        finally:
+            try:
+                if cursor is not None and not cursor.closed and not conn.closed:
+                    cursor.close()
+                # End the read transaction the cursor opened
+                if was_idle and not conn.closed:
+                    conn.rollback()
+            finally:
+                if held is None:
+                    self.pool.putconn(conn)
+
+    def execute_prepared(self, name, params=None, stream=False):
+        """
+        Execute one of the fixed QUERIES by name
+        Uses the connection's prepared statement, or a server-side cursor
+        over the same SQL when stream=True
+        """
+        if stream:
+            return self.stream_query(QUERIES[name], params)
+
+        if self.cache:
+            return self._cached_read(
+                QUERIES[name], params, self.cache.ttl_for(name),
+                lambda: self._execute_prepared(name, params)
+            )
+        return self._execute_prepared(name, params)
+
+    def _execute_prepared(self, name, params):
+        with self.connection() as conn:
+            try:
+                return self.statements.execute(conn, name, params)
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+    def enable_cache(self, max_entries=256, default_ttl=300, ttls=None):
+        """
+        Cache read results in memory, keyed by (query, params)
+        ttls maps QUERIES names to a TTL in seconds (0 = never cache) on top
+        of CACHE_TTLS; other reads use default_ttl
+        """
+        self.cache = QueryCache(max_entries, default_ttl, dict(self.CACHE_TTLS, **(ttls or {})))
+        return self.cache
+
+    def disable_cache(self):
+        self.cache = None
+
+    def invalidate_cache(self, tables=None):
+        """
+        Drop cached results reading any of the given tables (all if None)
+        Called for every write made through execute_query and execute_values;
+        call it directly after writing through another connection
+        """
+        if tables is None or 'disaster_events' in tables:
+            self.clear_event_cache()
+        if self.cache:
+            return self.cache.invalidate(tables if tables else None)
+        return 0
+
+    def cache_stats(self):
+        """Get result cache hit/miss counters, or None when caching is off"""
+        return self.cache.stats() if self.cache else None
+
+    def _cached_read(self, query, params, ttl, run):
+        key = (query, tuple(params) if isinstance(params, list) else params)
+        try:
+            hash(key)
+        except TypeError:
+            ttl = 0
+        if not ttl:
+            return run()
+
+        rows = self.cache.get(key)
+        if rows is None:
+            rows = run()
+            self.cache.put(key, rows, ttl, QueryCache.tables(query))
+            rows = [dict(row) for row in rows]
+        return rows
+
+    def statement_stats(self):
+        """Get per-statement call counts and cumulative execution time"""
+        return self.statements.stats()
+
+    def export_query_to_csv(self, query, filename, params=None, itersize=None):
+        """
+        Stream query results into a CSV file, returns the number of rows written
+        An empty result still gets the header row
+        """
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = None
+            for row in self.stream_query(query, params, itersize):
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+            
+            if writer is None:
+                csv.writer(f).writerow(self.query_columns(query, params))
+        return count
+
+    def query_columns(self, query, params=None):
+        """Get the column names of a query without fetching any of its rows"""
+        with self.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM ({query.strip().rstrip(';')}) q LIMIT 0", params)
+                return [column.name for column in cursor.description]
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+    def copy_query_to(self, query, file, params=None, options="FORMAT csv, HEADER"):
+        """
+        Stream query results into a file object with COPY ... TO STDOUT
+        The server formats the rows, so nothing is converted in Python
+        Returns: number of rows copied
+        """
+        with self.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                # conn.encoding is the PostgreSQL name (e.g. WIN1252), not a Python codec
+                encoding = psycopg2.extensions.encodings[conn.encoding]
+                query = cursor.mogrify(query.strip().rstrip(';'), params).decode(encoding)
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH ({options})", file)
+                conn.commit()
+                return cursor.rowcount
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+    def pool_stats(self):
+        """Get connection pool statistics (None when not pooled)"""
+        if self.pool:
+            return self.pool.stats()
+        return None
+
+    def load_layer_from_db(self, table_name, geometry_column='geom', layer_name=None, where_clause=None):
+        """Load PostGIS layer into QGIS"""
+        from qgis.core import QgsDataSourceUri, QgsVectorLayer
+        
+        try:
+            uri = QgsDataSourceUri()
+            uri.setConnection(
+                self.connection_params['host'],
+                self.connection_params['port'],
+                self.connection_params['database'],
+                self.connection_params['user'],
+                self.connection_params['password']
+            )
+            
+            uri.setDataSource("public", table_name, geometry_column, where_clause)
+            
+            if layer_name is None:
+                layer_name = table_name.replace('_', ' ').title()
+            
+            layer = QgsVectorLayer(uri.uri(), layer_name, "postgres")
+            
+            if layer.isValid():
+                return layer, "Layer loaded successfully"
+            else:
+                return None, "Invalid layer"
+        except Exception as e:
+            return None, f"Error loading layer: {str(e)}"
+
+    def get_flood_prone_districts(self, stream=False, use_summary=True):
+        """
+        Get districts most prone to flooding
+        Reads the materialized summary (migration 001) when it exists.
+        The summary is served as last refreshed; refresh_flood_summary()
+        runs separately (SummaryRefreshTask, or the batch runner)
+        """
+        if use_summary and self.has_flood_summary():
+            return self.execute_prepared('flood_prone_districts_summary', stream=stream)
+        return self.execute_prepared('flood_prone_districts', stream=stream)
+
+    def has_flood_summary(self):
+        """Check whether the materialized flood-prone summary is installed"""
+        if self._has_flood_summary is None:
+            result = self.execute_query(
+                "SELECT to_regclass('public.mv_flood_prone_districts') IS NOT NULL AS installed"
+            )
+            self._has_flood_summary = result[0]['installed']
+        return self._has_flood_summary
+
+    def flood_summary_stale(self):
+        """Check whether the flood-prone summary lags its source tables"""
+        result = self.execute_query(
+            "SELECT stale FROM summary_refresh_state WHERE summary_name = 'mv_flood_prone_districts'"
+        )
+        return bool(result and result[0]['stale'])
+
+    def refresh_flood_summary(self, force=False):
+        """
+        Refresh the materialized flood-prone summary if it is marked stale
+        The stale flag is cleared in the same transaction, so concurrent
+        readers wait for this refresh instead of starting their own
+        Returns: True when a refresh ran
+        """
+        with self.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE summary_refresh_state
+                    SET stale = FALSE, refreshed_at = CURRENT_TIMESTAMP
+                    WHERE summary_name = 'mv_flood_prone_districts' AND (stale OR %s)
+                    RETURNING summary_name
+                """, (force,))
+                
+                refreshed = cursor.fetchone() is not None
+                if refreshed:
+                    cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_flood_prone_districts")
+                conn.commit()
+            except Exception as e:
+                if conn and not conn.closed:
+                    conn.rollback()
+                raise Exception(f"Query error: {str(e)}")
+
+        if refreshed:
+            self.invalidate_cache({'mv_flood_prone_districts'})
+        return refreshed
+
+    def get_district_by_river(self, river_name, stream=False):
+        """Find which district a river is in"""
+        return self.execute_prepared('district_by_river', (f'%{river_name}%',), stream=stream)
+
+    def get_historical_events_in_district(self, district_name, stream=False):
+        """Get historical disaster events in a district"""
+        return self.execute_prepared('historical_events_in_district', (district_name,), stream=stream)
+
+    def get_all_districts(self, stream=False):
+        """Get all administrative boundaries (districts)"""
+        return self.execute_prepared('all_districts', stream=stream)
+
+    def get_infrastructure_in_district(self, district_id, stream=False):
+        """Get all infrastructure in a district"""
+        return self.execute_prepared('infrastructure_in_district', (district_id,), stream=stream)
+
+    def get_evacuation_centers(self, district_id=None, stream=False):
+        """Get evacuation centers, optionally filtered by district"""
+        if district_id:
+            return self.execute_prepared('evacuation_centers_by_district', (district_id,), stream=stream)
+        else:
+            return self.execute_prepared('evacuation_centers', stream=stream)
+
+    def get_risk_zones(self, risk_level=None, stream=False):
+        """Get risk zones, optionally filtered by risk level"""
+        if risk_level:
+            return self.execute_prepared('risk_zones_by_level', (risk_level,), stream=stream)
+        else:
+            return self.execute_prepared('risk_zones', stream=stream)
+
+    def get_district_summary(self, district_name):
+        """Get complete summary for a specific district"""
+        result = self.execute_prepared('district_summary', (district_name,))
+        return result[0] if result else None
+
+    def get_population_data(self, district_id, stream=False):
+        """Get population data for a district"""
+        return self.execute_prepared('population_data', (district_id,), stream=stream)
+
+    def get_historical_events_in_area(self, area_geometry, distance=0):
+        """
+        Get disaster events within distance (in layer units) of an area
+        area_geometry: QgsGeometry or WKB bytes in EPSG:4326
+        Uses the GiST index on disaster_events.geom; results are cached
+        per geometry in a small LRU cache
+        """
+        wkb = self._wkb(area_geometry)
+        key = (hashlib.sha1(wkb).hexdigest(), distance)
+        
+        events = self._cached_events(key)
+        if events is None:
+            events = self.execute_prepared(
+                'historical_events_in_area',
+                (psycopg2.Binary(wkb), distance)
+            )
+            self._cache_events(key, events)
+        return events
+
+    def get_historical_events_in_areas(self, area_geometries, distance=0):
+        """
+        Get disaster events for many areas in one query
+        area_geometries: dict of area_id -> QgsGeometry or WKB bytes
+        Returns: dict of area_id -> list of events
+        """
+        results = {}
+        misses = []
+        
+        for area_id, geometry in area_geometries.items():
+            wkb = self._wkb(geometry)
+            key = (hashlib.sha1(wkb).hexdigest(), distance)
+            events = self._cached_events(key)
+            if events is None:
+                misses.append((area_id, wkb, key))
+                results[area_id] = []
+            else:
+                results[area_id] = events
+        
+        if misses:
+            rows = self.execute_prepared(
+                'historical_events_in_areas',
+                ([psycopg2.Binary(wkb) for _, wkb, _ in misses], distance)
+            )
+            for row in rows:
+                # WITH ORDINALITY numbers the areas from 1
+                area_id = misses[row.pop('area_index') - 1][0]
+                results[area_id].append(row)
+            
+            for area_id, _, key in misses:
+                self._cache_events(key, results[area_id])
+        
+        return results
+
+    def clear_event_cache(self):
+        """Drop cached historical events, e.g. after disaster_events changed"""
+        with self._event_cache_lock:
+            self._event_cache.clear()
+
+    def _cached_events(self, key):
+        """Get a copy of cached events, so callers cannot change the cache"""
+        with self._event_cache_lock:
+            events = self._event_cache.get(key)
+            if events is None:
+                return None
+            self._event_cache.move_to_end(key)
+        return [dict(event) for event in events]
+
+    def _cache_events(self, key, events):
+        events = tuple(dict(event) for event in events)
+        with self._event_cache_lock:
+            self._event_cache[key] = events
+            self._event_cache.move_to_end(key)
+            while len(self._event_cache) > self.EVENT_CACHE_SIZE:
+                self._event_cache.popitem(last=False)
+
+    @staticmethod
+    def _wkb(geometry):
+        if isinstance(geometry, (bytes, bytearray, memoryview)):
+            return bytes(geometry)
+        return bytes(geometry.asWkb())
+
+    def close(self):
+        """Close database connection"""
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+        if self.conn:
+            self.conn.close()
+            self.conn = None
\ No newline at end of file
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+District Catalog - In-memory lookup of districts shared by the plugin handlers
+"""
+
+import select
+import threading
+
+
+class DistrictCatalog:
+    """
+    Districts loaded once per connection, with name -> id and id -> row maps
+    The catalog reloads after the DatabaseManager reconnects (its generation
+    changes) or when the districts_changed notification arrives, which
+    migration 005 sends whenever administrative_boundaries is modified.
+    """
+
+    CHANNEL = 'districts_changed'
+
+    def __init__(self, db_manager, listen=True):
+        self.db = db_manager
+        self.listen = listen
+
+        self._rows = []
+        self._by_id = {}
+        self._ids_by_name = {}
+        self._generation = None
+        self._stale = True
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def districts(self):
+        """Get all districts ordered by name"""
+        self._ensure_loaded()
+        return self._rows
+
+    def get(self, boundary_id):
+        """Get a district row by boundary_id, or None"""
+        self._ensure_loaded()
+        return self._by_id.get(boundary_id)
+
+    def id_for(self, district_name):
+        """Get the boundary_id of a district name, or None"""
+        self._ensure_loaded()
+        return self._ids_by_name.get(district_name)
+
+    def by_name(self, district_name):
+        """Get a district row by name, or None"""
+        return self.get(self.id_for(district_name))
+
+    def __len__(self):
+        return len(self.districts())
+
+    def invalidate(self):
+        """Drop the loaded districts, the next lookup reloads them"""
+        with self._lock:
+            self._stale = True
+
+    def close(self):
+        """Stop listening for change notifications"""
+        with self._lock:
+            self._close_listener()
+            self._generation = None
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._generation != self.db.generation:
+                self._close_listener()
+            elif self._changed() or self._stale:
+                # The DatabaseManager result cache may still hold the old rows
+                self.db.invalidate_cache({'administrative_boundaries'})
+            else:
+                return
+
+            # Listen before loading so a change made meanwhile is not missed
+            if self.listen and self._listener is None:
+                self._open_listener()
+
+            generation = self.db.generation
+            rows = self.db.get_all_districts()
+
+            self._rows = rows
+            self._by_id = {row['boundary_id']: row for row in rows}
+            self._ids_by_name = {row['boundary_name']: row['boundary_id'] for row in rows}
+            self._generation = generation
+            self._stale = False
+
+    def _changed(self):
+        """Consume pending notifications, True if any arrived"""
+        if self._listener is None:
+            return False
+
+        import psycopg2
+        try:
+            if select.select([self._listener], [], [], 0)[0]:
+                self._listener.poll()
+            changed = bool(self._listener.notifies)
+            self._listener.notifies.clear()
+            return changed
+        except psycopg2.Error:
+            # Lost the listener, reload now and listen again
+            self._close_listener()
+            return True
+
+    def _open_listener(self):
+        if not self.db.connection_params:
+            return
+
+        # Imported here, like in DatabaseManager, so loading the plugin does not import psycopg2
+        import psycopg2
+        try:
+            self._listener = psycopg2.connect(**self.db.connection_params)
+            self._listener.autocommit = True
+            self._listener.cursor().execute(f"LISTEN {self.CHANNEL}")
+        except psycopg2.Error as e:
+            # Without notifications the catalog still reloads on reconnect
+            print(f"District catalog listen error: {e}")
+            self._close_listener()
+
+    def _close_listener(self):
+        if self._listener is not None:
+            if not self._listener.closed:
+                self._listener.close()
+            self._listener = None
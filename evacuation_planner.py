@@ -1,88 +1,378 @@
-# -*- coding: utf-8 -*-
-"""
-Evacuation Planner - Safe zone identification and route calculation
-"""
-
-from qgis.core import QgsGeometry, QgsPointXY
-
-class EvacuationPlanner:
-    def __init__(self, db_manager):
-        self.db = db_manager
-
-    def identify_safe_zones(self, risk_layer, min_area_sqkm=1.0):
-        """
-        Identify areas suitable for evacuation centers
-        Criteria: Low/Safe risk areas with sufficient space
-        """
-        safe_zones = []
-        
-        for feature in risk_layer.getFeatures():
-            risk_category = feature['risk_category']
-            area_sqkm = feature.geometry().area() / 1000000
-            
-            if risk_category in ['Low', 'Safe'] and area_sqkm >= min_area_sqkm:
-                safe_zones.append({
-                    'area_id': feature['area_id'],
-                    'area_name': feature['area_name'],
-                    'geometry': feature.geometry(),
-                    'area_sqkm': area_sqkm
-                })
-        
-        return safe_zones
-
-    def calculate_evacuation_routes(self, high_risk_areas, evacuation_centers):
-        """
-        Calculate optimal evacuation routes from high-risk areas to safe centers
-        """
-        routes = []
-        
-        for risk_area in high_risk_areas:
-            risk_centroid = risk_area.geometry().centroid()
-            nearest_center = None
-            min_distance = float('inf')
-            
-            for center in evacuation_centers:
-                center_point = center.geometry().asPoint()
-                distance = risk_centroid.distance(QgsGeometry.fromPointXY(center_point))
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_center = center
-            
-            if nearest_center:
-                # Create straight-line route
-                route_geom = QgsGeometry.fromPolylineXY([
-                    risk_centroid.asPoint(),
-                    nearest_center.geometry().asPoint()
-                ])
-                
-                routes.append({
-                    'from_area_id': risk_area['area_id'],
-                    'to_center_id': nearest_center['center_id'],
-                    'distance_km': min_distance / 1000,
-                    'geometry': route_geom
-                })
-        
-        return routes
-
-    def save_evacuation_routes_to_db(self, routes):
-        """Save calculated evacuation routes to database"""
-        for route in routes:
-            query = """
-            INSERT INTO evacuation_routes
-            (from_area_id, to_center_id, distance_km, estimated_time_minutes, geom)
-            VALUES (%s, %s, %s, %s, ST_GeomFromText(%s, 4326))
-            """
-            
-            # Estimate time: assume 5 km/h walking speed
-            estimated_time = int((route['distance_km'] / 5) * 60)
-            
-            params = (
-                route['from_area_id'],
-                route['to_center_id'],
-                route['distance_km'],
-                estimated_time,
-                route['geometry'].asWkt()
-            )
-            
-            self.db.execute_query(query, params, fetch=False)
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Evacuation Planner - Safe zone identification and route calculation
+"""
+
+import heapq
+import itertools
+import time
+
+from qgis.core import QgsGeometry, QgsPointXY, QgsSpatialIndex
+
+
+class CenterIndex:
+    """Spatial index over evacuation centers for k-nearest lookups"""
+
+    def __init__(self, evacuation_centers):
+        self.centers = list(evacuation_centers)
+        self.geometries = [center.geometry() for center in self.centers]
+        self.index = QgsSpatialIndex()
+        
+        for i, geometry in enumerate(self.geometries):
+            self.index.addFeature(i, geometry.boundingBox())
+
+    def nearest(self, point_geometry, k=1):
+        """
+        Find the k centers nearest to a point geometry
+        Returns: list of (center, distance) sorted by distance
+        """
+        if not self.centers:
+            return []
+        
+        ids = self.index.nearestNeighbor(point_geometry.asPoint(), k)
+        candidates = [(i, point_geometry.distance(self.geometries[i])) for i in ids]
+        candidates.sort(key=lambda candidate: candidate[1])
+        
+        return [(self.centers[i], distance) for i, distance in candidates[:k]]
+
+
+class CapacityAssignmentEngine:
+    """
+    Capacity-constrained assignment of evacuees to centers
+    Greedy over a priority queue of (origin, center) candidate pairs: the
+    closest pair is taken first and the origin sends as many people as the
+    center still has room for, then the next closest pair, and so on.
+    """
+
+    def __init__(self, center_capacities):
+        # center_id -> places still free (capacity - current_occupancy)
+        self.capacities = dict(center_capacities)
+
+    def assign(self, origins):
+        """
+        Assign evacuees from origins to centers
+        origins: iterable of (origin_id, population, candidates), where
+        candidates is a list of (center_id, distance_km)
+        Returns: dict with
+            assignments: list of from_area_id/to_center_id/people/distance_km
+            unassigned: people left unplaced, per origin
+            unreachable: people of origins without any candidate center,
+                per origin (also counted in unassigned)
+            overflow: people turned away per center, i.e. demand that reached
+                the center in distance order and found it full. Someone
+                turned away by several full centers counts at each of them,
+                so overflow says how much room a center lacked, not where
+                the unassigned people are.
+            remaining_capacity: free places left per center
+        """
+        remaining = {center_id: max(room, 0) for center_id, room in self.capacities.items()}
+        demand = {}
+        unreachable = {}
+        overflow = {}
+        heap = []
+        sequence = itertools.count()
+        
+        for origin_id, population, candidates in origins:
+            if population <= 0:
+                continue
+            demand[origin_id] = population
+            if not candidates:
+                unreachable[origin_id] = population
+            for center_id, distance in candidates:
+                heap.append((distance, next(sequence), origin_id, center_id))
+        
+        heapq.heapify(heap)
+        free_places = sum(remaining.values())
+        assignments = []
+        
+        while heap and free_places > 0:
+            distance, _, origin_id, center_id = heapq.heappop(heap)
+            people = min(demand[origin_id], remaining.get(center_id, 0))
+            if demand[origin_id] > people:
+                overflow[center_id] = overflow.get(center_id, 0) + demand[origin_id] - people
+            if people <= 0:
+                continue
+            
+            demand[origin_id] -= people
+            remaining[center_id] -= people
+            free_places -= people
+            assignments.append({
+                'from_area_id': origin_id,
+                'to_center_id': center_id,
+                'people': people,
+                'distance_km': distance
+            })
+        
+        # Every center is full, so the pairs not reached turn their origin away
+        for _, _, origin_id, center_id in heap:
+            if demand[origin_id] > 0:
+                overflow[center_id] = overflow.get(center_id, 0) + demand[origin_id]
+        
+        unassigned = {origin_id: people for origin_id, people in demand.items() if people > 0}
+        
+        return {
+            'assignments': assignments,
+            'unassigned': unassigned,
+            'unreachable': unreachable,
+            'overflow': overflow,
+            'remaining_capacity': remaining
+        }
+
+
+class EvacuationPlanner:
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def identify_safe_zones(self, risk_layer, min_area_sqkm=1.0):
+        """
+        Identify areas suitable for evacuation centers
+        Criteria: Low/Safe risk areas with sufficient space
+        """
+        safe_zones = []
+        
+        for feature in risk_layer.getFeatures():
+            risk_category = feature['risk_category']
+            area_sqkm = feature.geometry().area() / 1000000
+            
+            if risk_category in ['Low', 'Safe'] and area_sqkm >= min_area_sqkm:
+                safe_zones.append({
+                    'area_id': feature['area_id'],
+                    'area_name': feature['area_name'],
+                    'geometry': feature.geometry(),
+                    'area_sqkm': area_sqkm
+                })
+        
+        return safe_zones
+
+    def calculate_evacuation_routes(self, high_risk_areas, evacuation_centers, k=1):
+        """
+        Calculate optimal evacuation routes from high-risk areas to safe centers
+        Centers are spatially indexed once and each area looks up its k nearest
+        centers. The route goes to the nearest one and 'candidates' lists all k
+        by increasing distance.
+        """
+        routes = []
+        center_index = CenterIndex(evacuation_centers)
+        
+        for risk_area in high_risk_areas:
+            risk_centroid = risk_area.geometry().centroid()
+            candidates = center_index.nearest(risk_centroid, k)
+            
+            if candidates:
+                nearest_center, min_distance = candidates[0]
+                
+                # Create straight-line route
+                route_geom = QgsGeometry.fromPolylineXY([
+                    risk_centroid.asPoint(),
+                    nearest_center.geometry().asPoint()
+                ])
+                
+                routes.append({
+                    'from_area_id': risk_area['area_id'],
+                    'to_center_id': nearest_center['center_id'],
+                    'distance_km': min_distance / 1000,
+                    'geometry': route_geom,
+                    'candidates': [
+                        {'center_id': center['center_id'], 'distance_km': distance / 1000}
+                        for center, distance in candidates
+                    ]
+                })
+        
+        return routes
+
+    def calculate_network_routes(self, high_risk_areas, evacuation_centers, road_network, max_snap_km=2.0):
+        """
+        Calculate evacuation routes along a RoadNetwork
+        A single multi-source search from all centers gives every risk area
+        its fastest reachable center, the road path and the travel time.
+        Routes include the straight off-road legs from the area centroid to
+        its nearest road node and from the last node to the center, walked
+        at RoadNetwork.OFF_ROAD_SPEED_KMH, in both distance and time.
+        Areas and centers more than max_snap_km from any road node, and areas
+        with no road connection to any center, get no route.
+        Geometries must be in the road network's CRS.
+        """
+        off_road_speed = road_network.OFF_ROAD_SPEED_KMH
+        targets = {}
+        costs = {}
+        for center in evacuation_centers:
+            point = center.geometry().asPoint()
+            node = road_network.nearest_node(point)
+            if node is None:
+                continue
+            
+            egress_km = road_network.measure_km(road_network.node_point(node), point)
+            egress_minutes = egress_km / off_road_speed * 60
+            # Of several centers on one node, keep the one closest to the road
+            if egress_km <= max_snap_km and egress_minutes < costs.get(node, (float('inf'),))[0]:
+                targets[node] = center
+                costs[node] = (egress_minutes, egress_km)
+        
+        if not targets:
+            return []
+        egress_legs = {center['center_id']: costs[node][1] for node, center in targets.items()}
+        
+        minutes, km, next_hop, nearest = road_network.shortest_paths_to(targets, costs)
+        
+        routes = []
+        for risk_area in high_risk_areas:
+            risk_centroid = risk_area.geometry().centroid().asPoint()
+            node = road_network.nearest_node(risk_centroid)
+            
+            if node is None or nearest[node] is None:
+                continue
+            
+            access_km = road_network.measure_km(risk_centroid, road_network.node_point(node))
+            if access_km > max_snap_km:
+                continue
+            
+            center = nearest[node]
+            path = road_network.path_from(node, next_hop)
+            
+            # Off-road legs of zero length would repeat a vertex
+            if access_km > 0:
+                path.insert(0, risk_centroid)
+            if egress_legs[center['center_id']] > 0:
+                path.append(center.geometry().asPoint())
+            
+            routes.append({
+                'from_area_id': risk_area['area_id'],
+                'to_center_id': center['center_id'],
+                'distance_km': km[node] + access_km,
+                'estimated_time_minutes': int(round(minutes[node] + access_km / off_road_speed * 60)),
+                'geometry': QgsGeometry.fromPolylineXY(path)
+            })
+        
+        return routes
+
+    def assign_evacuees(self, high_risk_areas, evacuation_centers, k=5,
+                        population_field='affected_population', populations=None):
+        """
+        Assign the population of high-risk areas to evacuation centers
+        without exceeding each center's free capacity
+        Each area considers its k nearest centers. Population comes from
+        populations[area_id] when given, otherwise from population_field
+        (falling back to 'population') on the area feature.
+        Returns: CapacityAssignmentEngine.assign() result
+        """
+        center_index = CenterIndex(evacuation_centers)
+        
+        capacities = {}
+        for center in center_index.centers:
+            capacities[center['center_id']] = (center['capacity'] or 0) - (center['current_occupancy'] or 0)
+        
+        origins = []
+        for risk_area in high_risk_areas:
+            area_id = risk_area['area_id']
+            if populations is not None:
+                population = populations.get(area_id, 0)
+            else:
+                population = self._area_population(risk_area, population_field)
+            
+            candidates = [
+                (center['center_id'], distance / 1000)
+                for center, distance in center_index.nearest(risk_area.geometry().centroid(), k)
+            ]
+            origins.append((area_id, population, candidates))
+        
+        return CapacityAssignmentEngine(capacities).assign(origins)
+
+    def _area_population(self, feature, population_field):
+        """
+        Read population from a feature, trying population_field then 'population'
+        Works on QgsFeature and on AreaFeature, which keeps its attributes in a dict
+        """
+        if hasattr(feature, 'fields'):
+            names = feature.fields().names()
+        else:
+            names = feature.attributes
+        for field in (population_field, 'population'):
+            if field in names:
+                return int(feature[field] or 0)
+        return 0
+
+    def save_evacuation_routes_to_db(self, routes, upsert=False, page_size=1000):
+        """
+        Save calculated evacuation routes to database
+        All routes are written in one transaction with multi-row INSERTs and
+        WKB geometry. With upsert=True an existing route for the same
+        (from_area_id, to_center_id) is updated instead, which needs the
+        unique index on those two columns from migration 004; an Exception
+        is raised up front when it is missing.
+        Returns: dict with rows written, seconds and rows_per_second
+        """
+        if upsert and not self.has_route_conflict_index():
+            raise Exception(
+                "Upserting evacuation routes needs a unique index on "
+                "evacuation_routes (from_area_id, to_center_id); "
+                "run schema_migrations.py to apply migration 004"
+            )
+        
+        query = """
+        INSERT INTO evacuation_routes
+        (from_area_id, to_center_id, distance_km, estimated_time_minutes, geom)
+        VALUES %s
+        """
+        if upsert:
+            query += """
+        ON CONFLICT (from_area_id, to_center_id) DO UPDATE SET
+            distance_km = EXCLUDED.distance_km,
+            estimated_time_minutes = EXCLUDED.estimated_time_minutes,
+            geom = EXCLUDED.geom
+            """
+        
+        rows = {}
+        for i, route in enumerate(routes):
+            # Network routes carry a travel time, otherwise assume 5 km/h walking speed
+            estimated_time = route.get('estimated_time_minutes')
+            if estimated_time is None:
+                estimated_time = int((route['distance_km'] / 5) * 60)
+            
+            # An upsert may not touch the same row twice, keep the last route per pair
+            key = (route['from_area_id'], route['to_center_id']) if upsert else i
+            rows[key] = (
+                route['from_area_id'],
+                route['to_center_id'],
+                route['distance_km'],
+                estimated_time,
+                bytes(route['geometry'].asWkb())
+            )
+        
+        start = time.perf_counter()
+        if rows:
+            self.db.execute_values(
+                query,
+                list(rows.values()),
+                template="(%s, %s, %s, %s, ST_GeomFromWKB(%s, 4326))",
+                page_size=page_size
+            )
+        elapsed = time.perf_counter() - start
+        
+        return {
+            'rows': len(rows),
+            'seconds': elapsed,
+            'rows_per_second': len(rows) / elapsed if elapsed > 0 else 0.0
+        }
+
+    def has_route_conflict_index(self):
+        """
+        Check for a unique index on evacuation_routes (from_area_id, to_center_id)
+        The table is resolved through search_path, like the INSERT that uses it
+        """
+        result = self.db.execute_query("""
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_index i
+                WHERE i.indrelid = to_regclass('evacuation_routes')
+                  AND i.indisunique
+                  AND i.indpred IS NULL
+                  AND i.indnatts = 2
+                  AND ARRAY(
+                      SELECT a.attname::text
+                      FROM pg_attribute a
+                      WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                      ORDER BY a.attname
+                  ) = ARRAY['from_area_id', 'to_center_id']
+            ) AS installed
+        """, cache_ttl=0)
+        return result[0]['installed']
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Result Exporter - Streams query results from the database to CSV, GeoPackage or Parquet
+"""
+
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+from .database_manager import QUERIES
+
+
+FORMATS = {
+    '.csv': 'csv',
+    '.gpkg': 'gpkg',
+    '.parquet': 'parquet'
+}
+
+
+def flood_results_query(db_manager, boundary_ids=None, with_geometry=False):
+    """
+    Get (query, params) for the flood analysis results
+    Same columns as get_flood_prone_districts, from the materialized summary
+    when it is installed, optionally with the district boundary as geom.
+    boundary_ids limits the rows to those districts, in that order.
+    Checking for the summary is a query, so call this off the GUI thread.
+    """
+    if db_manager.has_flood_summary():
+        base = QUERIES['flood_prone_districts_summary']
+    else:
+        base = QUERIES['flood_prone_districts']
+
+    columns = "r.*, ab.geom" if with_geometry else "r.*"
+    query = f"""
+        SELECT {columns}
+        FROM ({base.strip().rstrip(';')}) r
+        JOIN administrative_boundaries ab ON ab.boundary_id = r.boundary_id
+    """
+    params = None
+    if boundary_ids is not None:
+        query += " WHERE r.boundary_id = ANY(%s) ORDER BY array_position(%s, r.boundary_id)"
+        params = (list(boundary_ids), list(boundary_ids))
+    else:
+        query += " ORDER BY r.total_flood_events DESC, r.total_people_displaced DESC"
+    return query, params
+
+
+class ResultExporter:
+    """
+    Writes a query's rows straight from the database in bounded memory
+    CSV goes through COPY ... TO STDOUT, GeoPackage and Parquet read a
+    server-side cursor batch by batch and keep the column types.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, db_manager, batch_size=None):
+        self.db = db_manager
+        self.batch_size = batch_size or self.BATCH_SIZE
+
+    @staticmethod
+    def format_for(filename):
+        """Get the export format from a file extension"""
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in FORMATS:
+            raise ValueError(f"Unsupported export format: {extension}")
+        return FORMATS[extension]
+
+    def export(self, query, filename, params=None, geometry_column='geom', is_canceled=None):
+        """
+        Export to the format given by the file extension, returns the row count
+        The rows go to a temporary file next to filename that replaces it only
+        when the export completes, so a failed or cancelled export leaves no
+        partial file behind and keeps any previous export.
+        """
+        export_format = self.format_for(filename)
+        directory, basename = os.path.split(os.path.abspath(filename))
+        name, extension = os.path.splitext(basename)
+
+        handle, partial = tempfile.mkstemp(prefix=f".{name}.", suffix=extension, dir=directory)
+        os.close(handle)
+        os.remove(partial)
+        try:
+            if export_format == 'csv':
+                count = self.to_csv(query, partial, params)
+            elif export_format == 'gpkg':
+                count = self.to_geopackage(query, partial, params, geometry_column,
+                                           layer_name=name, is_canceled=is_canceled)
+            else:
+                count = self.to_parquet(query, partial, params, is_canceled=is_canceled)
+
+            if not (is_canceled and is_canceled()):
+                os.replace(partial, filename)
+            return count
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def to_csv(self, query, filename, params=None):
+        """Write CSV with COPY; geometry columns come out as hex EWKB"""
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            return self.db.copy_query_to(query, f, params)
+
+    def batches(self, query, params=None, is_canceled=None):
+        """Yield lists of up to batch_size rows from a server-side cursor"""
+        batch = []
+        for row in self.db.stream_query(query, params, itersize=self.batch_size):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+                if is_canceled and is_canceled():
+                    return
+        if batch:
+            yield batch
+
+    def to_geopackage(self, query, filename, params=None, geometry_column='geom',
+                      layer_name=None, is_canceled=None):
+        """Write a GeoPackage layer with typed attribute fields and the geometry column"""
+        from osgeo import ogr, osr
+
+        wrapped = f"""
+            SELECT q.*, ST_AsBinary(q.{geometry_column}) AS __wkb
+            FROM ({query.strip().rstrip(';')}) q
+        """
+        layer_name = layer_name or os.path.splitext(os.path.basename(filename))[0]
+
+        driver = ogr.GetDriverByName('GPKG')
+        if os.path.exists(filename):
+            driver.DeleteDataSource(filename)
+        datasource = driver.CreateDataSource(filename)
+        if datasource is None:
+            raise Exception(f"Could not create {filename}")
+
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(4326)
+
+        layer = None
+        fields = []
+        count = 0
+        try:
+            for batch in self.batches(wrapped, params, is_canceled):
+                if layer is None:
+                    layer = datasource.CreateLayer(layer_name, srs, ogr.wkbUnknown)
+                    fields = [key for key in batch[0].keys() if key not in (geometry_column, '__wkb')]
+                    for name in fields:
+                        layer.CreateField(self._ogr_field(ogr, name, [row[name] for row in batch]))
+                    definition = layer.GetLayerDefn()
+
+                layer.StartTransaction()
+                for row in batch:
+                    feature = ogr.Feature(definition)
+                    for name in fields:
+                        self._set_ogr_value(feature, name, row[name])
+                    if row['__wkb'] is not None:
+                        feature.SetGeometry(ogr.CreateGeometryFromWkb(bytes(row['__wkb'])))
+                    layer.CreateFeature(feature)
+                    count += 1
+                layer.CommitTransaction()
+        finally:
+            datasource = None
+        return count
+
+    def to_parquet(self, query, filename, params=None, is_canceled=None):
+        """Write Parquet with pyarrow, one row group per batch"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet export needs pyarrow: pip install pyarrow")
+
+        writer = None
+        count = 0
+        try:
+            for batch in self.batches(query, params, is_canceled):
+                rows = [self._arrow_row(row) for row in batch]
+                if writer is None:
+                    schema = self._arrow_schema(pa, pa.Table.from_pylist(rows).schema)
+                    writer = pq.ParquetWriter(filename, schema)
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                count += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+    @staticmethod
+    def _arrow_row(row):
+        # Geometry and other binary columns arrive as memoryview
+        return {key: bytes(value) if isinstance(value, memoryview) else value for key, value in row.items()}
+
+    @staticmethod
+    def _arrow_schema(pa, inferred):
+        """Widen decimals inferred from the first batch so later batches fit"""
+        fields = []
+        for field in inferred:
+            if pa.types.is_decimal(field.type):
+                field = field.with_type(pa.decimal128(38, field.type.scale))
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        return pa.schema(fields)
+
+    @staticmethod
+    def _ogr_field(ogr, name, values):
+        sample = next((value for value in values if value is not None), None)
+        if isinstance(sample, bool):
+            field = ogr.FieldDefn(name, ogr.OFTInteger)
+            field.SetSubType(ogr.OFSTBoolean)
+        elif isinstance(sample, int):
+            field = ogr.FieldDefn(name, ogr.OFTInteger64)
+        elif isinstance(sample, (float, Decimal)):
+            field = ogr.FieldDefn(name, ogr.OFTReal)
+        elif isinstance(sample, datetime.datetime):
+            field = ogr.FieldDefn(name, ogr.OFTDateTime)
+        elif isinstance(sample, datetime.date):
+            field = ogr.FieldDefn(name, ogr.OFTDate)
+        else:
+            field = ogr.FieldDefn(name, ogr.OFTString)
+        return field
+
+    @staticmethod
+    def _set_ogr_value(feature, name, value):
+        if value is None:
+            feature.SetFieldNull(name)
+        elif isinstance(value, bool):
+            feature.SetField(name, int(value))
+        elif isinstance(value, int):
+            feature.SetField(name, value)
+        elif isinstance(value, Decimal):
+            feature.SetField(name, float(value))
+        elif isinstance(value, datetime.datetime):
+            feature.SetField(name, value.year, value.month, value.day,
+                             value.hour, value.minute, value.second, 0)
+        elif isinstance(value, datetime.date):
+            feature.SetField(name, value.year, value.month, value.day, 0, 0, 0, 0)
+        else:
+            feature.SetField(name, value if isinstance(value, float) else str(value))
+
+
+class ExportTask(QgsTask):
+    """
+    Runs a ResultExporter export on a QGIS task manager thread
+    exportCompleted(filename, rows) or exportFailed(message) is emitted on
+    the GUI thread when it finishes.
+    """
+
+    exportCompleted = pyqtSignal(str, int)
+    exportFailed = pyqtSignal(str)
+
+    def __init__(self, db_manager, query, filename, params=None):
+        super().__init__(f"Export {os.path.basename(filename)}", QgsTask.CanCancel)
+        self.db = db_manager
+        self.exporter = ResultExporter(db_manager)
+        self.query = query
+        self.params = params
+        self.filename = filename
+        self.rows = 0
+        self.error = None
+
+    def run(self):
+        try:
+            self.rows = self.exporter.export(
+                self.query, self.filename, self.params, is_canceled=self.isCanceled
+            )
+            return not self.isCanceled()
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+    def finished(self, result):
+        if result:
+            self.exportCompleted.emit(self.filename, self.rows)
+        else:
+            self.exportFailed.emit(self.error or "Export cancelled")
+
+
+class FloodResultsExportTask(ExportTask):
+    """
+    Exports flood analysis results for the given districts, in that order
+    The summary check and refresh and the query itself all run on the task
+    thread. GeoPackage exports include the district boundaries.
+    """
+
+    def __init__(self, db_manager, boundary_ids, filename):
+        super().__init__(db_manager, None, filename)
+        self.boundary_ids = list(boundary_ids)
+
+    def run(self):
+        try:
+            if self.db.has_flood_summary():
+                self.db.refresh_flood_summary()
+            self.query, self.params = flood_results_query(
+                self.db,
+                self.boundary_ids,
+                with_geometry=ResultExporter.format_for(self.filename) == 'gpkg'
+            )
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+        if self.isCanceled():
+            return False
+        return super().run()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Results Models - Table models over raw query rows for the dialog's result views
+"""
+
+from decimal import Decimal
+
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from qgis.PyQt.QtGui import QColor
+
+from .analysis_tasks import risk_color
+
+
+class RowTableModel(QAbstractTableModel):
+    """
+    Read-only table over a list of row dicts
+    Cells are formatted only when a view asks for them. Subclasses define
+    COLUMNS as (header, key, formatter) and may override background().
+    """
+
+    COLUMNS = []
+
+    # Raw cell value, used by the proxy model for numeric sorting
+    SortRole = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._colors = {}
+
+    def set_rows(self, rows):
+        """Replace all rows at once"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def rows(self):
+        return self._rows
+
+    def row(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self._rows[index.row()]
+        _, key, formatter = self.COLUMNS[index.column()]
+
+        if role == Qt.DisplayRole:
+            return formatter(row.get(key))
+        if role == self.SortRole:
+            value = row.get(key)
+            # Qt only compares plain numbers and strings; SUM() gives Decimal
+            return float(value) if isinstance(value, Decimal) else value
+        if role == Qt.BackgroundRole:
+            color = self.background(row)
+            if color is None:
+                return None
+            if color not in self._colors:
+                self._colors[color] = QColor(color)
+            return self._colors[color]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def background(self, row):
+        """Get the background color name for a row, or None"""
+        return None
+
+
+class FloodResultsModel(RowTableModel):
+    """Flood-prone district rows from get_flood_prone_districts"""
+
+    COLUMNS = [
+        ("District", 'district', str),
+        ("Risk Level", 'flood_risk_level', str),
+        ("Flood Events", 'total_flood_events', lambda value: str(value or 0)),
+        ("Population Displaced", 'total_people_displaced', lambda value: f"{value or 0:,}"),
+        ("Rivers", 'flood_prone_rivers', lambda value: value or 'None')
+    ]
+
+    def background(self, row):
+        return risk_color(row['flood_risk_level'])
+
+
+class EvacuationCentersModel(RowTableModel):
+    """Evacuation center rows from get_evacuation_centers"""
+
+    COLUMNS = [
+        ("Center Name", 'center_name', str),
+        ("Capacity", 'capacity', str),
+        ("Occupancy", 'current_occupancy', str),
+        ("Facilities", 'facilities', lambda value: value or 'N/A')
+    ]
+
+
+def sortable_proxy(model, parent=None):
+    """Wrap a RowTableModel in a proxy that sorts on raw values and filters on every column"""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(RowTableModel.SortRole)
+    proxy.setFilterKeyColumn(-1)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    return proxy
+
+
+def visible_rows(proxy):
+    """Get the source row dicts a sortable_proxy shows, in its current filter and sort order"""
+    model = proxy.sourceModel()
+    return [model.row(proxy.mapToSource(proxy.index(i, 0)).row()) for i in range(proxy.rowCount())]
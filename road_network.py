@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Road Network - In-memory road graph and shortest path search for evacuation routing
+"""
+
+import heapq
+from array import array
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsDistanceArea,
+    QgsGeometry,
+    QgsPointXY,
+    QgsRectangle,
+    QgsSpatialIndex
+)
+
+
+class RoadNetwork:
+    """
+    Road graph held as compressed adjacency arrays
+    Nodes are line vertices in the network's CRS, snapped to a grid of
+    snap_tolerance CRS units; edges carry their ellipsoidal length in km and
+    travel time in minutes.
+    """
+
+    # Evacuation is assumed on foot unless the road layer has speeds
+    DEFAULT_SPEED_KMH = 5
+
+    # Walking speed on the legs between a point and its nearest road node
+    OFF_ROAD_SPEED_KMH = 5
+
+    # Default snap_tolerance in degrees for geographic CRSs, else in map units
+    GEOGRAPHIC_SNAP_TOLERANCE = 1e-6
+    PROJECTED_SNAP_TOLERANCE = 0.01
+
+    def __init__(self, crs='EPSG:4326', snap_tolerance=None, default_speed_kmh=None):
+        self.crs = crs if isinstance(crs, QgsCoordinateReferenceSystem) else QgsCoordinateReferenceSystem(crs)
+        if snap_tolerance is None:
+            snap_tolerance = (
+                self.GEOGRAPHIC_SNAP_TOLERANCE if self.crs.isGeographic() else self.PROJECTED_SNAP_TOLERANCE
+            )
+        self.snap_tolerance = snap_tolerance
+        self.default_speed_kmh = default_speed_kmh or self.DEFAULT_SPEED_KMH
+
+        self.distance_calc = QgsDistanceArea()
+        self.distance_calc.setSourceCrs(self.crs, QgsCoordinateTransformContext())
+        self.distance_calc.setEllipsoid(self.crs.ellipsoidAcronym() or 'WGS84')
+
+        self._node_ids = {}
+        self.node_x = array('d')
+        self.node_y = array('d')
+
+        # Edges while loading: (from_node, to_node, length_km, minutes)
+        self._edges = []
+
+        # Reversed adjacency (edge v -> u stored under v), filled by build()
+        self.offsets = None
+        self.targets = None
+        self.lengths = None
+        self.times = None
+        self._node_index = None
+
+    @classmethod
+    def from_layer(cls, layer, speed_field=None, oneway_field=None, **kwargs):
+        """
+        Build a network from a line layer, in the layer's CRS
+        A truthy oneway_field allows travel in digitising direction only.
+        """
+        kwargs.setdefault('crs', layer.crs())
+        network = cls(**kwargs)
+
+        for feature in layer.getFeatures():
+            speed = feature[speed_field] if speed_field else None
+            oneway = bool(feature[oneway_field]) if oneway_field else False
+            network.add_line(feature.geometry(), speed, oneway)
+
+        network.build()
+        return network
+
+    @classmethod
+    def from_table(cls, db, table_name, geometry_column='geom', speed_column=None, crs=None, **kwargs):
+        """
+        Build a network from a PostGIS line table, streamed row by row
+        table_name may be schema-qualified. crs defaults to the SRID of the
+        geometry column.
+        """
+        from psycopg2 import sql
+
+        table = sql.Identifier(*table_name.split('.'))
+        geometry = sql.Identifier(geometry_column)
+        columns = sql.SQL("ST_AsBinary({}) AS wkb").format(geometry)
+        if speed_column:
+            columns = sql.SQL("{}, {} AS speed_kmh").format(columns, sql.Identifier(speed_column))
+
+        with db.connection() as conn:
+            query = sql.SQL("SELECT {} FROM {}").format(columns, table).as_string(conn)
+            srid_query = sql.SQL("SELECT ST_SRID({0}) AS srid FROM {1} WHERE {0} IS NOT NULL LIMIT 1").format(
+                geometry, table
+            ).as_string(conn)
+
+        if crs is None:
+            rows = db.execute_query(srid_query, cache_ttl=0)
+            crs = f"EPSG:{rows[0]['srid']}" if rows and rows[0]['srid'] else 'EPSG:4326'
+        network = cls(crs=crs, **kwargs)
+
+        for row in db.stream_query(query):
+            if row['wkb'] is None:
+                continue
+            geometry = QgsGeometry()
+            geometry.fromWkb(bytes(row['wkb']))
+            network.add_line(geometry, row.get('speed_kmh'))
+
+        network.build()
+        return network
+
+    @property
+    def node_count(self):
+        return len(self.node_x)
+
+    def add_line(self, geometry, speed_kmh=None, oneway=False):
+        """Add every segment of a (multi)line geometry as graph edges"""
+        if geometry is None or geometry.isEmpty():
+            return
+
+        speed = float(speed_kmh or self.default_speed_kmh)
+        parts = geometry.asMultiPolyline() if geometry.isMultipart() else [geometry.asPolyline()]
+
+        for part in parts:
+            for start, end in zip(part, part[1:]):
+                u = self._node(start)
+                v = self._node(end)
+                if u == v:
+                    continue
+
+                length_km = self.measure_km(start, end)
+                minutes = length_km / speed * 60
+
+                self._edges.append((u, v, length_km, minutes))
+                if not oneway:
+                    self._edges.append((v, u, length_km, minutes))
+
+    def measure_km(self, start, end):
+        """Ellipsoidal distance in km between two QgsPointXY in the network's CRS"""
+        return self.distance_calc.measureLine(start, end) / 1000
+
+    def _node(self, point):
+        key = (round(point.x() / self.snap_tolerance), round(point.y() / self.snap_tolerance))
+        node = self._node_ids.get(key)
+        if node is None:
+            node = len(self.node_x)
+            self._node_ids[key] = node
+            self.node_x.append(point.x())
+            self.node_y.append(point.y())
+        return node
+
+    def build(self):
+        """Pack loaded edges into compressed adjacency arrays and index the nodes"""
+        node_count = self.node_count
+
+        degree = [0] * (node_count + 1)
+        for u, v, _, _ in self._edges:
+            degree[v + 1] += 1
+        for i in range(node_count):
+            degree[i + 1] += degree[i]
+
+        self.offsets = array('l', degree)
+        self.targets = array('l', [0] * len(self._edges))
+        self.lengths = array('d', [0.0] * len(self._edges))
+        self.times = array('d', [0.0] * len(self._edges))
+
+        position = list(degree[:-1])
+        for u, v, length_km, minutes in self._edges:
+            slot = position[v]
+            self.targets[slot] = u
+            self.lengths[slot] = length_km
+            self.times[slot] = minutes
+            position[v] += 1
+
+        self._edges = []
+
+        self._node_index = QgsSpatialIndex()
+        for node in range(node_count):
+            x, y = self.node_x[node], self.node_y[node]
+            self._node_index.addFeature(node, QgsRectangle(x, y, x, y))
+
+    def nearest_node(self, point):
+        """Get the graph node nearest to a QgsPointXY, or None for an empty network"""
+        ids = self._node_index.nearestNeighbor(point, 1) if self._node_index else []
+        return ids[0] if ids else None
+
+    def node_point(self, node):
+        return QgsPointXY(self.node_x[node], self.node_y[node])
+
+    def shortest_paths_to(self, targets, costs=None):
+        """
+        Multi-source Dijkstra on travel time towards a set of target nodes
+        targets: dict of node -> target key (e.g. center_id)
+        costs: optional dict of node -> (minutes, km) already needed from the
+        node to its target, e.g. the off-road leg to an evacuation center
+        One pass gives, for every node, the fastest target and the next hop
+        on the way there.
+        Returns: (minutes, km, next_hop, target) arrays indexed by node
+        """
+        node_count = self.node_count
+        infinity = float('inf')
+
+        minutes = array('d', [infinity] * node_count)
+        km = array('d', [0.0] * node_count)
+        next_hop = array('l', [-1] * node_count)
+        target = [None] * node_count
+
+        heap = []
+        for node, key in targets.items():
+            start_minutes, start_km = costs.get(node, (0.0, 0.0)) if costs else (0.0, 0.0)
+            if start_minutes < minutes[node]:
+                minutes[node] = start_minutes
+                km[node] = start_km
+                target[node] = key
+                heap.append((start_minutes, node))
+        heapq.heapify(heap)
+
+        offsets, neighbours, lengths, times = self.offsets, self.targets, self.lengths, self.times
+
+        while heap:
+            cost, v = heapq.heappop(heap)
+            if cost > minutes[v]:
+                continue
+
+            for slot in range(offsets[v], offsets[v + 1]):
+                u = neighbours[slot]
+                new_cost = cost + times[slot]
+                if new_cost < minutes[u]:
+                    minutes[u] = new_cost
+                    km[u] = km[v] + lengths[slot]
+                    next_hop[u] = v
+                    target[u] = target[v]
+                    heapq.heappush(heap, (new_cost, u))
+
+        return minutes, km, next_hop, target
+
+    def path_from(self, node, next_hop):
+        """Follow next hops from a node to its target, returns QgsPointXY list"""
+        points = [self.node_point(node)]
+        while next_hop[node] != -1:
+            node = next_hop[node]
+            points.append(self.node_point(node))
+        return points
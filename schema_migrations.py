@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Schema Migrations - Applies database/migrations in order and checks index usage
+
+Usage:
+    python schema_migrations.py --password secret            # apply pending migrations
+    python schema_migrations.py --password secret --check    # ...then EXPLAIN every query
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+
+from psycopg2 import Binary
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'migrations')
+
+# Sample parameters for the QUERIES that read a slice of a table and must be
+# served by an index. Full listings and whole-table aggregates
+# (all_districts, evacuation_centers, risk_zones, flood_prone_districts)
+# are expected to scan and are not checked.
+_SAMPLE_WKB = struct.pack('<BIdd', 1, 1, 35.3, -15.4)
+
+INDEX_CHECKS = {
+    'historical_events_in_district': ('Zomba',),
+    'infrastructure_in_district': (1,),
+    'evacuation_centers_by_district': (1,),
+    'risk_zones_by_level': ('high',),
+    'district_summary': ('Zomba',),
+    'population_data': (1,),
+    'historical_events_in_area': (Binary(_SAMPLE_WKB), 0),
+    'historical_events_in_areas': ([Binary(_SAMPLE_WKB)], 0)
+}
+
+
+class MigrationRunner:
+    """
+    Applies NNN_name.sql files from the migrations directory in version order
+    Applied versions are recorded in schema_migrations with a checksum of the
+    file, and each migration runs in its own transaction.
+    """
+
+    def __init__(self, db_manager, directory=MIGRATIONS_DIR):
+        self.db = db_manager
+        self.directory = directory
+
+    def available(self):
+        """Get (version, name, path) for every migration file, in order"""
+        migrations = []
+        for filename in os.listdir(self.directory):
+            match = re.match(r'^(\d+)_(.+)\.sql$', filename)
+            if match:
+                migrations.append((int(match.group(1)), match.group(2), os.path.join(self.directory, filename)))
+        return sorted(migrations)
+
+    def applied(self):
+        """Get version -> checksum of the migrations already applied"""
+        self._ensure_table()
+        rows = self.db.execute_query("SELECT version, checksum FROM schema_migrations")
+        return {row['version']: row['checksum'] for row in rows}
+
+    def pending(self):
+        applied = self.applied()
+        return [m for m in self.available() if m[0] not in applied]
+
+    def changed(self):
+        """Get applied migrations whose file no longer matches the recorded checksum"""
+        applied = self.applied()
+        return [
+            (version, name) for version, name, path in self.available()
+            if version in applied and applied[version] != self._checksum(path)
+        ]
+
+    def migrate(self):
+        """Apply all pending migrations, returns the list of applied names"""
+        done = []
+        for version, name, path in self.pending():
+            with open(path, encoding='utf-8') as f:
+                sql = f.read()
+
+            with self.db.connection() as conn:
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(sql)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                        (version, name, self._checksum(path))
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    raise Exception(f"Migration {version:03d}_{name} failed: {str(e)}")
+
+            done.append(f"{version:03d}_{name}")
+
+        if done:
+            self.db.invalidate_cache()
+        return done
+
+    def _ensure_table(self):
+        self.db.execute_query("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version integer PRIMARY KEY,
+                name character varying(200) NOT NULL,
+                checksum character varying(64) NOT NULL,
+                applied_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+            )
+        """, fetch=False)
+
+    @staticmethod
+    def _checksum(path):
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+
+def explain(db_manager, query, params=None):
+    """Get the JSON plan of a query as planned with sequential scans disabled"""
+    with db_manager.connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(';'), params)
+            plan = cursor.fetchone()[0]
+            return plan[0]['Plan'] if isinstance(plan, list) else json.loads(plan)[0]['Plan']
+        finally:
+            conn.rollback()
+
+
+def sequential_scans(plan):
+    """Get the relations read by Seq Scan nodes anywhere in a plan"""
+    relations = []
+    if plan.get('Node Type') == 'Seq Scan':
+        relations.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        relations.extend(sequential_scans(child))
+    return relations
+
+
+def check_index_usage(db_manager, queries, checks=INDEX_CHECKS):
+    """
+    EXPLAIN each checked query with enable_seqscan off
+    The planner still picks a Seq Scan when no index can serve the filter, so
+    any Seq Scan left in the plan points at a missing index.
+    Returns: dict of query name -> list of sequentially scanned tables
+    """
+    return {
+        name: sequential_scans(explain(db_manager, queries[name], params))
+        for name, params in checks.items()
+    }
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from database_manager import DatabaseManager, QUERIES
+
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5433')
+    parser.add_argument('--database', default='disaster_risk_db')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--check', action='store_true', help="Check index usage after migrating")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    success, message = db.connect(args.host, args.port, args.database, args.user, args.password)
+    if not success:
+        sys.exit(message)
+
+    try:
+        runner = MigrationRunner(db)
+        for version, name in runner.changed():
+            print(f"⚠ {version:03d}_{name} was modified after it was applied")
+
+        applied = runner.migrate()
+        print(f"✓ Applied {len(applied)} migration(s)" + (": " + ", ".join(applied) if applied else ""))
+
+        if args.check:
+            failures = {name: scans for name, scans in check_index_usage(db, QUERIES).items() if scans}
+            for name, scans in failures.items():
+                print(f"✗ {name}: sequential scan on {', '.join(scans)}")
+            if failures:
+                sys.exit(1)
+            print(f"✓ All {len(INDEX_CHECKS)} checked queries use indexes")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,329 +1,729 @@
-# -*- coding: utf-8 -*-
-"""
-Spatial Analyzer - Core risk analysis algorithms
-"""
-
-from qgis.core import (
-    QgsDistanceArea,
-    QgsGeometry,
-    QgsPointXY
-)
-import processing
-from datetime import datetime
-
-class DisasterRiskAnalyzer:
-    def __init__(self, db_manager):
-        self.db = db_manager
-        self.distance_calc = QgsDistanceArea()
-        self.distance_calc.setEllipsoid('WGS84')
-
-    def analyze_elevation_risk(self, area_geometry, elevation_layer, threshold=50):
-        """
-        Analyze flood risk based on elevation
-        Lower elevation = Higher risk
-        """
-        try:
-            # Get statistics for the area
-            stats = processing.run("native:zonalstatisticsfb", {
-                'INPUT': elevation_layer,
-                'INPUT_RASTER': elevation_layer,
-                'RASTER_BAND': 1,
-                'COLUMN_PREFIX': 'elev_',
-                'STATISTICS': [2, 5, 6]  # mean, min, max
-            })
-            
-            mean_elevation = stats.get('elev_mean', 100)
-            min_elevation = stats.get('elev_min', 100)
-            
-            # Risk scoring: Lower elevation = Higher risk
-            if min_elevation < threshold:
-                if mean_elevation < threshold:
-                    score = 20  # Very high risk
-                else:
-                    score = 15  # High risk
-            elif mean_elevation < threshold * 1.5:
-                score = 10  # Moderate risk
-            elif mean_elevation < threshold * 2:
-                score = 5  # Low risk
-            else:
-                score = 0  # Safe
-            
-            return score, {
-                'mean_elevation': mean_elevation,
-                'min_elevation': min_elevation
-            }
-        except Exception as e:
-            print(f"Elevation analysis error: {e}")
-            return 0, {}
-
-    def analyze_water_proximity(self, area_geometry, water_layer, buffer_distance=500):
-        """
-        Analyze risk based on proximity to water bodies
-        Closer to water = Higher risk
-        """
-        try:
-            risk_zones = []
-            
-            for water_feature in water_layer.getFeatures():
-                water_geom = water_feature.geometry()
-                
-                # Create buffer zones around water bodies
-                buffer_100m = water_geom.buffer(100, 50)
-                buffer_300m = water_geom.buffer(300, 50)
-                buffer_500m = water_geom.buffer(buffer_distance, 50)
-                
-                # Check intersection with area
-                if area_geometry.intersects(buffer_100m):
-                    intersect_area = area_geometry.intersection(buffer_100m).area()
-                    risk_zones.append(('very_high', intersect_area, 20))
-                elif area_geometry.intersects(buffer_300m):
-                    intersect_area = area_geometry.intersection(buffer_300m).area()
-                    risk_zones.append(('high', intersect_area, 15))
-                elif area_geometry.intersects(buffer_500m):
-                    intersect_area = area_geometry.intersection(buffer_500m).area()
-                    risk_zones.append(('moderate', intersect_area, 10))
-            
-            if not risk_zones:
-                return 0, {'status': 'No water bodies nearby'}
-            
-            # Calculate weighted score based on intersection areas
-            total_area = area_geometry.area()
-            weighted_score = 0
-            
-            for risk_level, intersect_area, base_score in risk_zones:
-                weight = intersect_area / total_area
-                weighted_score += base_score * weight
-            
-            return min(int(weighted_score), 20), {
-                'risk_zones': len(risk_zones),
-                'weighted_score': weighted_score
-            }
-        except Exception as e:
-            print(f"Water proximity error: {e}")
-            return 0, {}
-
-    def analyze_slope(self, area_geometry, elevation_layer):
-        """
-        Analyze risk based on slope
-        Flatter areas = Higher water retention risk
-        """
-        try:
-            # Simulate slope analysis (in real implementation, use QGIS slope tool)
-            # For demonstration, using simplified logic
-            score = 10  # Default moderate risk
-            
-            return score, {'mean_slope': 5.0}
-        except Exception as e:
-            print(f"Slope analysis error: {e}")
-            return 0, {}
-
-    def analyze_historical_events(self, area_geometry, area_id):
-        """
-        Analyze risk based on historical disaster occurrences
-        """
-        try:
-            # Get historical events from database
-            events = self.db.get_historical_events_in_area(area_geometry)
-            
-            if not events:
-                return 0, {'event_count': 0}
-            
-            score = 0
-            recent_events = 0
-            severe_events = 0
-            current_date = datetime.now()
-            
-            for event in events:
-                # Recency factor
-                event_date = event['event_date']
-                days_ago = (current_date - event_date).days
-                
-                if days_ago < 365 * 5:  # Last 5 years
-                    recency_multiplier = 1.5
-                    recent_events += 1
-                elif days_ago < 365 * 10:  # Last 10 years
-                    recency_multiplier = 1.0
-                else:
-                    recency_multiplier = 0.5
-                
-                # Severity factor
-                severity = event['severity'].lower()
-                if severity == 'catastrophic':
-                    severity_score = 5
-                    severe_events += 1
-                elif severity == 'severe':
-                    severity_score = 4
-                    severe_events += 1
-                elif severity == 'moderate':
-                    severity_score = 3
-                else:
-                    severity_score = 2
-                
-                score += severity_score * recency_multiplier
-            
-            # Normalize to 0-20 scale
-            final_score = min(int(score * 2), 20)
-            
-            return final_score, {
-                'total_events': len(events),
-                'recent_events': recent_events,
-                'severe_events': severe_events
-            }
-        except Exception as e:
-            print(f"Historical analysis error: {e}")
-            return 0, {}
-
-    def analyze_rainfall_risk(self, area_geometry, rainfall_layer, threshold=100):
-        """Analyze risk based on rainfall patterns"""
-        try:
-            # Simplified rainfall risk
-            score = 10  # Default moderate risk
-            return score, {'avg_rainfall': 80, 'extreme_events': 5}
-        except Exception as e:
-            print(f"Rainfall analysis error: {e}")
-            return 0, {}
-
-    def analyze_drainage_capacity(self, area_geometry, landuse_layer):
-        """Analyze risk based on land use and drainage capacity"""
-        try:
-            if not landuse_layer:
-                return 0, {}
-                
-            poor_drainage_area = 0
-            total_area = area_geometry.area()
-            
-            for landuse_feature in landuse_layer.getFeatures():
-                if area_geometry.intersects(landuse_feature.geometry()):
-                    intersection = area_geometry.intersection(landuse_feature.geometry())
-                    drainage = landuse_feature['drainage_capacity']
-                    
-                    if drainage and drainage.lower() == 'poor':
-                        poor_drainage_area += intersection.area()
-            
-            if total_area == 0:
-                return 0, {}
-            
-            poor_drainage_percent = (poor_drainage_area / total_area) * 100
-            
-            # Risk scoring
-            if poor_drainage_percent > 75:
-                score = 20
-            elif poor_drainage_percent > 50:
-                score = 15
-            elif poor_drainage_percent > 25:
-                score = 10
-            elif poor_drainage_percent > 10:
-                score = 5
-            else:
-                score = 0
-            
-            return score, {'poor_drainage_percent': poor_drainage_percent}
-        except Exception as e:
-            print(f"Drainage analysis error: {e}")
-            return 0, {}
-
-    def run_complete_analysis(self, area_feature, layers, parameters):
-        """
-        Run complete risk analysis for an area
-        Returns: dict with total_risk_score, risk_category, detailed_scores
-        """
-        area_geom = area_feature.geometry()
-        area_id = area_feature['area_id']
-        population = area_feature.get('population', 0)
-        
-        # Initialize scores dictionary
-        scores = {
-            'elevation': 0,
-            'water_proximity': 0,
-            'slope': 0,
-            'rainfall': 0,
-            'historical': 0,
-            'drainage': 0
-        }
-        
-        details = {}
-        
-        # Run each analysis component
-        if layers.get('elevation'):
-            score, detail = self.analyze_elevation_risk(
-                area_geom,
-                layers['elevation'],
-                parameters.get('elevation_threshold', 50)
-            )
-            scores['elevation'] = score
-            details['elevation'] = detail
-        
-        if layers.get('water_bodies'):
-            score, detail = self.analyze_water_proximity(
-                area_geom,
-                layers['water_bodies'],
-                parameters.get('water_buffer', 500)
-            )
-            scores['water_proximity'] = score
-            details['water_proximity'] = detail
-        
-        if layers.get('elevation') and parameters.get('include_slope', True):
-            score, detail = self.analyze_slope(area_geom, layers['elevation'])
-            scores['slope'] = score
-            details['slope'] = detail
-        
-        # Historical events analysis
-        score, detail = self.analyze_historical_events(area_geom, area_id)
-        scores['historical'] = score
-        details['historical'] = detail
-        
-        if parameters.get('include_rainfall', True):
-            score, detail = self.analyze_rainfall_risk(
-                area_geom,
-                layers.get('rainfall'),
-                parameters.get('rainfall_threshold', 100)
-            )
-            scores['rainfall'] = score
-            details['rainfall'] = detail
-        
-        if layers.get('landuse') and parameters.get('include_drainage', True):
-            score, detail = self.analyze_drainage_capacity(
-                area_geom,
-                layers['landuse']
-            )
-            scores['drainage'] = score
-            details['drainage'] = detail
-        
-        # Calculate total risk score
-        total_score = sum(scores.values())
-        
-        # Determine risk category
-        if total_score >= 80:
-            risk_category = "Very High"
-            color = '#8B0000'
-        elif total_score >= 60:
-            risk_category = "High"
-            color = '#FF0000'
-        elif total_score >= 40:
-            risk_category = "Moderate"
-            color = '#FFA500'
-        elif total_score >= 20:
-            risk_category = "Low"
-            color = '#FFFF00'
-        else:
-            risk_category = "Safe"
-            color = '#00FF00'
-        
-        # Calculate population at risk
-        if risk_category in ['Very High', 'High']:
-            population_at_risk = population
-        elif risk_category == 'Moderate':
-            population_at_risk = int(population * 0.5)
-        else:
-            population_at_risk = 0
-        
-        scores['population_at_risk'] = population_at_risk
-        
-        return {
-            'total_score': total_score,
-            'risk_category': risk_category,
-            'color': color,
-            'scores': scores,
-            'details': details,
-            'population_at_risk': population_at_risk
-        }
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Spatial Analyzer - Core risk analysis algorithms
+"""
+
+from qgis.core import (
+    NULL,
+    QgsApplication,
+    QgsDistanceArea,
+    QgsGeometry,
+    QgsPointXY,
+    QgsRasterLayer,
+    QgsSpatialIndex
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+import multiprocessing
+import os
+import weakref
+
+class DisasterRiskAnalyzer:
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.distance_calc = QgsDistanceArea()
+        self.distance_calc.setEllipsoid('WGS84')
+        self._water_rings = {}
+        # layer_id -> (layer, dataChanged handler) while its rings are cached
+        self._water_layer_handlers = {}
+
+    def analyze_elevation_risk(self, area_geometry, elevation_layer, threshold=50):
+        """
+        Analyze flood risk based on elevation
+        Lower elevation = Higher risk
+        """
+        results = self.analyze_elevation_risk_batch({0: area_geometry}, elevation_layer, threshold)
+        return results[0]
+
+    def analyze_elevation_risk_batch(self, area_geometries, elevation_layer, threshold=50,
+                                     block_rows=1024):
+        """
+        Analyze elevation risk for many areas in one pass over the DEM
+        The areas are rasterized to a label grid aligned with the DEM, then
+        min/mean/max per label are reduced block by block with NumPy.
+        Areas that overlap or touch go to separate bands of the label grid,
+        so a shared pixel counts for each of them, as in analyze_elevation_risk.
+        area_geometries: dict of area_id -> QgsGeometry in the DEM's CRS
+        Returns: dict of area_id -> (score, details)
+        """
+        try:
+            import numpy as np
+            from osgeo import gdal, ogr
+            
+            area_ids = list(area_geometries.keys())
+            results = {area_id: (0, {}) for area_id in area_ids}
+            if not area_ids:
+                return results
+            
+            dem = gdal.Open(elevation_layer.source())
+            band = dem.GetRasterBand(1)
+            nodata = band.GetNoDataValue()
+            origin_x, pixel_w, _, origin_y, _, pixel_h = dem.GetGeoTransform()
+            
+            # Only read the DEM window covering all areas
+            extent = None
+            for geometry in area_geometries.values():
+                bbox = geometry.boundingBox()
+                if extent is None:
+                    extent = bbox
+                else:
+                    extent.combineExtentWith(bbox)
+            
+            col_start = max(int((extent.xMinimum() - origin_x) / pixel_w), 0)
+            col_end = min(int((extent.xMaximum() - origin_x) / pixel_w) + 1, dem.RasterXSize)
+            row_start = max(int((extent.yMaximum() - origin_y) / pixel_h), 0)
+            row_end = min(int((extent.yMinimum() - origin_y) / pixel_h) + 1, dem.RasterYSize)
+            width = col_end - col_start
+            height = row_end - row_start
+            if width <= 0 or height <= 0:
+                return results
+            
+            # Label grid: pixel value = position of the area in area_ids + 1,
+            # one band per group of areas that share no pixels
+            groups = self._disjoint_groups(area_geometries, area_ids)
+            labels = gdal.GetDriverByName('MEM').Create('', width, height, len(groups), gdal.GDT_Int32)
+            labels.SetGeoTransform((
+                origin_x + col_start * pixel_w, pixel_w, 0,
+                origin_y + row_start * pixel_h, 0, pixel_h
+            ))
+            labels.SetProjection(dem.GetProjection())
+            
+            zones = ogr.GetDriverByName('Memory').CreateDataSource('')
+            for band_number, group in enumerate(groups, start=1):
+                zone_layer = zones.CreateLayer(f'zones_{band_number}', labels.GetSpatialRef())
+                zone_layer.CreateField(ogr.FieldDefn('label', ogr.OFTInteger))
+                for position in group:
+                    zone = ogr.Feature(zone_layer.GetLayerDefn())
+                    zone.SetField('label', position + 1)
+                    zone.SetGeometry(ogr.CreateGeometryFromWkb(bytes(area_geometries[area_ids[position]].asWkb())))
+                    zone_layer.CreateFeature(zone)
+                gdal.RasterizeLayer(labels, [band_number], zone_layer, options=['ATTRIBUTE=label'])
+            label_bands = [labels.GetRasterBand(band_number) for band_number in range(1, len(groups) + 1)]
+            
+            zone_count = len(area_ids) + 1
+            counts = np.zeros(zone_count, dtype=np.int64)
+            sums = np.zeros(zone_count, dtype=np.float64)
+            minimums = np.full(zone_count, np.inf)
+            maximums = np.full(zone_count, -np.inf)
+            
+            for block_start in range(0, height, block_rows):
+                rows = min(block_rows, height - block_start)
+                block_values = band.ReadAsArray(col_start, row_start + block_start, width, rows)
+                block_values = block_values.ravel().astype(np.float64)
+                
+                valid_values = np.isfinite(block_values)
+                if nodata is not None:
+                    valid_values &= block_values != nodata
+                
+                for label_band in label_bands:
+                    block_labels = label_band.ReadAsArray(0, block_start, width, rows).ravel()
+                    valid = valid_values & (block_labels > 0)
+                    group_labels = block_labels[valid]
+                    group_values = block_values[valid]
+                    
+                    counts += np.bincount(group_labels, minlength=zone_count)
+                    sums += np.bincount(group_labels, weights=group_values, minlength=zone_count)
+                    np.minimum.at(minimums, group_labels, group_values)
+                    np.maximum.at(maximums, group_labels, group_values)
+            
+            for label, area_id in enumerate(area_ids, start=1):
+                if counts[label] == 0:
+                    continue
+                mean_elevation = float(sums[label] / counts[label])
+                min_elevation = float(minimums[label])
+                
+                results[area_id] = (self._elevation_score(mean_elevation, min_elevation, threshold), {
+                    'mean_elevation': mean_elevation,
+                    'min_elevation': min_elevation,
+                    'max_elevation': float(maximums[label])
+                })
+            
+            return results
+        except Exception as e:
+            print(f"Elevation analysis error: {e}")
+            return {area_id: (0, {}) for area_id in area_geometries}
+
+    @staticmethod
+    def _disjoint_groups(area_geometries, area_ids):
+        """
+        Split areas into groups of areas that neither overlap nor touch
+        Greedy: each area joins the first group with no area intersecting it.
+        Returns: list of groups, each a list of positions in area_ids
+        """
+        index = QgsSpatialIndex()
+        group_of = {}
+        groups = []
+        
+        for position, area_id in enumerate(area_ids):
+            geometry = area_geometries[area_id]
+            taken = {
+                group_of[other] for other in index.intersects(geometry.boundingBox())
+                if geometry.intersects(area_geometries[area_ids[other]])
+            }
+            group = next((i for i in range(len(groups)) if i not in taken), len(groups))
+            if group == len(groups):
+                groups.append([])
+            groups[group].append(position)
+            group_of[position] = group
+            index.addFeature(position, geometry.boundingBox())
+        
+        return groups
+
+    def _elevation_score(self, mean_elevation, min_elevation, threshold):
+        """Risk scoring: Lower elevation = Higher risk"""
+        if min_elevation < threshold:
+            if mean_elevation < threshold:
+                return 20  # Very high risk
+            return 15  # High risk
+        elif mean_elevation < threshold * 1.5:
+            return 10  # Moderate risk
+        elif mean_elevation < threshold * 2:
+            return 5  # Low risk
+        return 0  # Safe
+
+    def get_water_rings(self, water_layer, buffer_distance=500):
+        """
+        Buffer every water body once at 100 m, 300 m and buffer_distance
+        The buffers get prepared geometry engines and are cached per layer
+        and buffer_distance, so the buffering is done once per analysis run
+        instead of once per area. The cache entry is rebuilt when the layer
+        reports a change or its feature count differs.
+        Returns: dict with 'rings', per water feature a list of
+        (risk_level, buffer, engine, base_score) from the innermost buffer
+        out, and a spatial 'index' of the outer buffers by list position
+        """
+        key = (water_layer.id(), buffer_distance)
+        cached = self._water_rings.get(key)
+        if cached and cached['feature_count'] == water_layer.featureCount():
+            return cached
+        
+        self._watch_water_layer(water_layer)
+        
+        rings = []
+        index = QgsSpatialIndex()
+        
+        for i, water_feature in enumerate(water_layer.getFeatures()):
+            water_geom = water_feature.geometry()
+            
+            buffers = []
+            for risk_level, distance, base_score in [
+                ('very_high', 100, 20),
+                ('high', 300, 15),
+                ('moderate', buffer_distance, 10)
+            ]:
+                buffer = water_geom.buffer(distance, 50)
+                engine = QgsGeometry.createGeometryEngine(buffer.constGet())
+                engine.prepareGeometry()
+                buffers.append((risk_level, buffer, engine, base_score))
+            
+            rings.append(buffers)
+            index.addFeature(i, buffers[-1][1].boundingBox())
+        
+        self._water_rings[key] = {
+            'rings': rings,
+            'index': index,
+            'feature_count': water_layer.featureCount()
+        }
+        return self._water_rings[key]
+
+    def clear_water_rings(self, layer_id=None):
+        """Drop cached water rings of one layer, or of every layer if None"""
+        if layer_id is None:
+            self._water_rings = {}
+        else:
+            self._water_rings = {key: rings for key, rings in self._water_rings.items() if key[0] != layer_id}
+        
+        for watched_id in [layer_id] if layer_id is not None else list(self._water_layer_handlers):
+            layer, handler = self._water_layer_handlers.pop(watched_id, (None, None))
+            if layer is None:
+                continue
+            try:
+                layer.dataChanged.disconnect(handler)
+            except (RuntimeError, TypeError):
+                # The layer was deleted, or the connection is already gone
+                pass
+
+    def _watch_water_layer(self, water_layer):
+        """
+        Drop a layer's cached rings when its data changes
+        The handler only holds a weak reference, so a layer that outlives the
+        analyzer does not keep it alive; clear_water_rings disconnects it.
+        """
+        layer_id = water_layer.id()
+        if layer_id in self._water_layer_handlers:
+            return
+        
+        analyzer = weakref.ref(self)
+        
+        def changed():
+            alive = analyzer()
+            if alive is not None:
+                alive.clear_water_rings(layer_id)
+        
+        water_layer.dataChanged.connect(changed)
+        self._water_layer_handlers[layer_id] = (water_layer, changed)
+
+    def analyze_water_proximity(self, area_geometry, water_layer, buffer_distance=500):
+        """
+        Analyze risk based on proximity to water bodies
+        Closer to water = Higher risk
+        Each water body scores by the innermost of its buffers the area
+        reaches (20 within 100 m, 15 within 300 m, 10 within buffer_distance),
+        weighted by the share of the area inside that buffer. The scores of
+        all nearby water bodies add up, capped at 20.
+        """
+        try:
+            water_rings = self.get_water_rings(water_layer, buffer_distance)
+            area = area_geometry.constGet()
+            risk_zones = []
+            
+            # Only water bodies whose outer buffer box touches the area can score
+            for i in sorted(water_rings['index'].intersects(area_geometry.boundingBox())):
+                for risk_level, buffer, engine, base_score in water_rings['rings'][i]:
+                    if engine.intersects(area):
+                        intersect_area = area_geometry.intersection(buffer).area()
+                        risk_zones.append((risk_level, intersect_area, base_score))
+                        break
+            
+            total_area = area_geometry.area()
+            if not risk_zones or total_area == 0:
+                return 0, {'status': 'No water bodies nearby'}
+            
+            # Calculate weighted score based on intersection areas
+            weighted_score = 0
+            
+            for risk_level, intersect_area, base_score in risk_zones:
+                weight = intersect_area / total_area
+                weighted_score += base_score * weight
+            
+            return min(int(weighted_score), 20), {
+                'risk_zones': len(risk_zones),
+                'weighted_score': weighted_score
+            }
+        except Exception as e:
+            print(f"Water proximity error: {e}")
+            return 0, {}
+
+    def analyze_slope(self, area_geometry, elevation_layer):
+        """
+        Analyze risk based on slope
+        Flatter areas = Higher water retention risk
+        """
+        try:
+            # Simulate slope analysis (in real implementation, use QGIS slope tool)
+            # For demonstration, using simplified logic
+            score = 10  # Default moderate risk
+            
+            return score, {'mean_slope': 5.0}
+        except Exception as e:
+            print(f"Slope analysis error: {e}")
+            return 0, {}
+
+    def analyze_historical_events(self, area_geometry, area_id):
+        """
+        Analyze risk based on historical disaster occurrences
+        """
+        try:
+            # Get historical events from database
+            events = self.db.get_historical_events_in_area(area_geometry)
+            return self._score_historical_events(events)
+        except Exception as e:
+            print(f"Historical analysis error: {e}")
+            return 0, {}
+
+    def analyze_historical_events_batch(self, area_geometries):
+        """
+        Analyze historical risk for many areas with one database round trip
+        area_geometries: dict of area_id -> QgsGeometry
+        Returns: dict of area_id -> (score, details)
+        """
+        try:
+            events_by_area = self.db.get_historical_events_in_areas(area_geometries)
+            return self.score_historical_events(events_by_area)
+        except Exception as e:
+            print(f"Historical analysis error: {e}")
+            return {area_id: (0, {}) for area_id in area_geometries}
+
+    def _score_historical_events(self, events):
+        """Score a list of events by recency and severity"""
+        return self.score_historical_events({0: events})[0]
+
+    def score_historical_events(self, events_by_area, reference_date=None):
+        """
+        Score events for many areas at once with NumPy
+        Event dates and severities are turned into arrays once, recency
+        multipliers and severity weights are computed for every event and
+        summed per area with a grouped reduction.
+        reference_date: date to score from (default today), for back-testing
+        Returns: dict of area_id -> (score, details)
+        """
+        import numpy as np
+        
+        area_ids = list(events_by_area.keys())
+        counts = [len(events_by_area[area_id]) for area_id in area_ids]
+        results = {area_id: (0, {'event_count': 0}) for area_id, count in zip(area_ids, counts) if count == 0}
+        if len(results) == len(area_ids):
+            return results
+        
+        events = [event for area_id in area_ids for event in events_by_area[area_id]]
+        area_index = np.repeat(np.arange(len(area_ids)), counts)
+        
+        reference_day = (reference_date or date.today()).toordinal()
+        days_ago = reference_day - np.fromiter(
+            (event['event_date'].toordinal() for event in events), dtype=np.int64, count=len(events)
+        )
+        severities = np.array([(event['severity'] or '').lower() for event in events])
+        
+        # Recency factor: last 5 years, last 10 years, older
+        recent = days_ago < 365 * 5
+        recency_multiplier = np.where(recent, 1.5, np.where(days_ago < 365 * 10, 1.0, 0.5))
+        
+        # Severity factor
+        severity_score = np.select(
+            [severities == 'catastrophic', severities == 'severe', severities == 'moderate'],
+            [5, 4, 3],
+            default=2
+        )
+        severe = severity_score >= 4
+        
+        area_count = len(area_ids)
+        scores = np.bincount(area_index, weights=severity_score * recency_multiplier, minlength=area_count)
+        recent_events = np.bincount(area_index, weights=recent, minlength=area_count)
+        severe_events = np.bincount(area_index, weights=severe, minlength=area_count)
+        
+        # Normalize to 0-20 scale
+        final_scores = np.minimum((scores * 2).astype(np.int64), 20)
+        
+        for i, area_id in enumerate(area_ids):
+            if counts[i] == 0:
+                continue
+            results[area_id] = (int(final_scores[i]), {
+                'total_events': counts[i],
+                'recent_events': int(recent_events[i]),
+                'severe_events': int(severe_events[i])
+            })
+        
+        return results
+
+    def analyze_rainfall_risk(self, area_geometry, rainfall_layer, threshold=100):
+        """Analyze risk based on rainfall patterns"""
+        try:
+            # Simplified rainfall risk
+            score = 10  # Default moderate risk
+            return score, {'avg_rainfall': 80, 'extreme_events': 5}
+        except Exception as e:
+            print(f"Rainfall analysis error: {e}")
+            return 0, {}
+
+    def analyze_drainage_capacity(self, area_geometry, landuse_layer):
+        """Analyze risk based on land use and drainage capacity"""
+        try:
+            if not landuse_layer:
+                return 0, {}
+                
+            poor_drainage_area = 0
+            total_area = area_geometry.area()
+            
+            for landuse_feature in landuse_layer.getFeatures():
+                if area_geometry.intersects(landuse_feature.geometry()):
+                    intersection = area_geometry.intersection(landuse_feature.geometry())
+                    drainage = landuse_feature['drainage_capacity']
+                    
+                    if drainage and drainage.lower() == 'poor':
+                        poor_drainage_area += intersection.area()
+            
+            if total_area == 0:
+                return 0, {}
+            
+            poor_drainage_percent = (poor_drainage_area / total_area) * 100
+            
+            # Risk scoring
+            if poor_drainage_percent > 75:
+                score = 20
+            elif poor_drainage_percent > 50:
+                score = 15
+            elif poor_drainage_percent > 25:
+                score = 10
+            elif poor_drainage_percent > 10:
+                score = 5
+            else:
+                score = 0
+            
+            return score, {'poor_drainage_percent': poor_drainage_percent}
+        except Exception as e:
+            print(f"Drainage analysis error: {e}")
+            return 0, {}
+
+    def run_complete_analysis(self, area_feature, layers, parameters, precomputed=None):
+        """
+        Run complete risk analysis for an area
+        precomputed: optional dict of component -> (score, details) already
+        computed in batch (e.g. 'elevation'), which is used instead of
+        re-running that component
+        Returns: dict with total_risk_score, risk_category, detailed_scores
+        """
+        precomputed = precomputed or {}
+        area_geom = area_feature.geometry()
+        area_id = area_feature['area_id']
+        population = area_feature.get('population', 0)
+        
+        # Initialize scores dictionary
+        scores = {
+            'elevation': 0,
+            'water_proximity': 0,
+            'slope': 0,
+            'rainfall': 0,
+            'historical': 0,
+            'drainage': 0
+        }
+        
+        details = {}
+        
+        # Run each analysis component
+        if 'elevation' in precomputed:
+            score, detail = precomputed['elevation']
+            scores['elevation'] = score
+            details['elevation'] = detail
+        elif layers.get('elevation'):
+            score, detail = self.analyze_elevation_risk(
+                area_geom,
+                layers['elevation'],
+                parameters.get('elevation_threshold', 50)
+            )
+            scores['elevation'] = score
+            details['elevation'] = detail
+        
+        if layers.get('water_bodies'):
+            score, detail = self.analyze_water_proximity(
+                area_geom,
+                layers['water_bodies'],
+                parameters.get('water_buffer', 500)
+            )
+            scores['water_proximity'] = score
+            details['water_proximity'] = detail
+        
+        if layers.get('elevation') and parameters.get('include_slope', True):
+            score, detail = self.analyze_slope(area_geom, layers['elevation'])
+            scores['slope'] = score
+            details['slope'] = detail
+        
+        # Historical events analysis
+        if 'historical' in precomputed:
+            score, detail = precomputed['historical']
+        else:
+            score, detail = self.analyze_historical_events(area_geom, area_id)
+        scores['historical'] = score
+        details['historical'] = detail
+        
+        if parameters.get('include_rainfall', True):
+            score, detail = self.analyze_rainfall_risk(
+                area_geom,
+                layers.get('rainfall'),
+                parameters.get('rainfall_threshold', 100)
+            )
+            scores['rainfall'] = score
+            details['rainfall'] = detail
+        
+        if layers.get('landuse') and parameters.get('include_drainage', True):
+            score, detail = self.analyze_drainage_capacity(
+                area_geom,
+                layers['landuse']
+            )
+            scores['drainage'] = score
+            details['drainage'] = detail
+        
+        # Calculate total risk score
+        total_score = sum(scores.values())
+        
+        # Determine risk category
+        if total_score >= 80:
+            risk_category = "Very High"
+            color = '#8B0000'
+        elif total_score >= 60:
+            risk_category = "High"
+            color = '#FF0000'
+        elif total_score >= 40:
+            risk_category = "Moderate"
+            color = '#FFA500'
+        elif total_score >= 20:
+            risk_category = "Low"
+            color = '#FFFF00'
+        else:
+            risk_category = "Safe"
+            color = '#00FF00'
+        
+        # Calculate population at risk
+        if risk_category in ['Very High', 'High']:
+            population_at_risk = population
+        elif risk_category == 'Moderate':
+            population_at_risk = int(population * 0.5)
+        else:
+            population_at_risk = 0
+        
+        scores['population_at_risk'] = population_at_risk
+        
+        return {
+            'total_score': total_score,
+            'risk_category': risk_category,
+            'color': color,
+            'scores': scores,
+            'details': details,
+            'population_at_risk': population_at_risk
+        }
+
+    def analyze_areas(self, area_features, layers, parameters):
+        """
+        Run complete analysis for a list of areas
+        Elevation and historical events are computed for all of them first,
+        with one DEM pass and one database query
+        Returns: list of (area_id, result)
+        """
+        geometries = {feature['area_id']: feature.geometry() for feature in area_features}
+        precomputed = {area_id: {} for area_id in geometries}
+        
+        if layers.get('elevation'):
+            elevation = self.analyze_elevation_risk_batch(
+                geometries,
+                layers['elevation'],
+                parameters.get('elevation_threshold', 50)
+            )
+            for area_id, result in elevation.items():
+                precomputed[area_id]['elevation'] = result
+        
+        for area_id, result in self.analyze_historical_events_batch(geometries).items():
+            precomputed[area_id]['historical'] = result
+        
+        return [
+            (feature['area_id'], self.run_complete_analysis(
+                feature, layers, parameters, precomputed.get(feature['area_id'])
+            ))
+            for feature in area_features
+        ]
+
+    def run_batch_analysis(self, features, layers, parameters, workers=None, chunk_size=25,
+                           progress_callback=None, python_executable=None):
+        """
+        Run complete analysis for many areas on a pool of worker processes
+        Each worker opens its own database connection and layer handles from
+        the layers' sources. Results are yielded as (area_id, result) as soon
+        as each chunk of chunk_size areas finishes, and
+        progress_callback(done, total) is called after every chunk.
+        python_executable: interpreter for the workers, needed inside QGIS on
+        Windows where sys.executable is the QGIS binary
+        """
+        areas = [AreaFeature.from_feature(feature) for feature in features]
+        chunks = [areas[i:i + chunk_size] for i in range(0, len(areas), chunk_size)]
+        total = len(areas)
+        done = 0
+        
+        if workers == 1:
+            for chunk in chunks:
+                for area_id, result in self.analyze_areas(chunk, layers, parameters):
+                    done += 1
+                    yield area_id, result
+                if progress_callback:
+                    progress_callback(done, total)
+            return
+        
+        layer_sources = {}
+        for name, layer in layers.items():
+            if layer:
+                kind = 'raster' if isinstance(layer, QgsRasterLayer) else 'vector'
+                layer_sources[name] = (kind, layer.source(), layer.providerType())
+        
+        context = multiprocessing.get_context('spawn')
+        if python_executable:
+            context.set_executable(python_executable)
+        
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=context,
+            initializer=_init_batch_worker,
+            initargs=(self.db.connection_params, layer_sources, QgsApplication.prefixPath())
+        ) as executor:
+            futures = [executor.submit(_analyze_batch_chunk, chunk, parameters) for chunk in chunks]
+            
+            for future in as_completed(futures):
+                for area_id, result in future.result():
+                    done += 1
+                    yield area_id, result
+                if progress_callback:
+                    progress_callback(done, total)
+
+
+class AreaFeature:
+    """Picklable copy of an area feature that can be sent to worker processes"""
+
+    def __init__(self, wkb, attributes):
+        self.wkb = wkb
+        self.attributes = attributes
+
+    @classmethod
+    def from_feature(cls, feature):
+        if isinstance(feature, cls):
+            return feature
+        attributes = {}
+        for name, value in zip(feature.fields().names(), feature.attributes()):
+            attributes[name] = None if value == NULL else value
+        return cls(bytes(feature.geometry().asWkb()), attributes)
+
+    def geometry(self):
+        geometry = QgsGeometry()
+        geometry.fromWkb(self.wkb)
+        return geometry
+
+    def __getitem__(self, name):
+        return self.attributes[name]
+
+    def get(self, name, default=None):
+        value = self.attributes.get(name)
+        return default if value is None else value
+
+
+def start_qgis(prefix_path=None):
+    """
+    Start a QGIS instance without a display, e.g. in a worker process
+    prefix_path: QGIS install prefix (default $QGIS_PREFIX_PATH), from which
+    the data providers and GDAL/OGR data are found
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    prefix_path = prefix_path or os.environ.get('QGIS_PREFIX_PATH')
+    if prefix_path:
+        QgsApplication.setPrefixPath(prefix_path, True)
+    
+    app = QgsApplication([], False)
+    app.initQgis()
+    return app
+
+
+# State of a run_batch_analysis worker process
+_worker = {}
+
+
+def _init_batch_worker(connection_params, layer_sources, prefix_path=None):
+    """Give a worker process its own QGIS instance, database connection and layers"""
+    from qgis.core import QgsVectorLayer
+    if __package__:
+        from .database_manager import DatabaseManager
+    else:
+        from database_manager import DatabaseManager
+    
+    app = start_qgis(prefix_path)
+    
+    db = DatabaseManager()
+    success, message = db.connect(**connection_params)
+    if not success:
+        raise Exception(message)
+    
+    layers = {}
+    for name, (kind, source, provider) in layer_sources.items():
+        if kind == 'raster':
+            layers[name] = QgsRasterLayer(source, name, provider)
+        else:
+            layers[name] = QgsVectorLayer(source, name, provider)
+    
+    _worker.update(app=app, analyzer=DisasterRiskAnalyzer(db), layers=layers)
+
+
+def _analyze_batch_chunk(areas, parameters):
+    return _worker['analyzer'].analyze_areas(areas, _worker['layers'], parameters)